@@ -6,12 +6,27 @@ import face_recognition as fr
 import logging
 import pandas as pd
 import uuid
+import os
+import tempfile
 from live_face_recognizer import LiveFaceRecognizer
+from attendance_report import DAILY_FIELDS, MEMBER_FIELDS
+from attendance_store import export_csv
+from face_detector import get_detector
+from face_tracker import FaceTracker
+from motion_scheduler import MotionScheduler
+from enrollment_quality import prepare_encodings, score_capture
+from recognition_service import RecognitionServiceClient, RemoteRecognizer
+from video_pipeline import FrameGrabber, RecognitionPipeline, StageStats, draw_faces
+import config
+import metrics
 import time
 
+# Per-rerun timing; Streamlit reruns this whole script on every interaction
+rerun_start = time.perf_counter()
+
 angles = ['Center', 'Left', 'Right', 'Upper Left', 'Upper Right', 'Lower Left', 'Lower Right']
 
-def capture_video():
+def capture_video(workers=config.PIPELINE_WORKERS):
     try:
         cap = cv2.VideoCapture(0)
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, 680)
@@ -22,46 +37,198 @@ def capture_video():
             st.error("❌ **Cannot open webcam.**")
             return None
 
+        opened_at = time.perf_counter()
+        first_frame_shown = False
         video_placeholder = st.empty()
+        stats_placeholder = st.empty()
         st.write("ℹ️ **Press 'q' or Stop the app to end video stream.**")
 
-        frame_count = 0  # Initialize frame counter
-
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                st.error("❌ **Failed to capture frame.**")
-                break
+        # Capture, recognition and rendering run as separate stages: the grabber
+        # thread keeps the newest frame, recognition workers process whichever frame
+        # is newest when they become free, and this loop draws the latest results.
+        grabber = FrameGrabber(cap).start()
+        tracker = FaceTracker(recognizer) if config.FACE_TRACKING else None
+        scheduler = MotionScheduler() if config.ADAPTIVE_SCHEDULING else None
+        pipeline = RecognitionPipeline(recognizer, grabber, workers=workers, tracker=tracker,
+                                       scheduler=scheduler).start()
+        render_stats = StageStats('render')
+        last_frame_id = 0
+        last_stats_update = 0.0
 
-            if frame_count % 5 == 0:
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                try:
-                    recognized_faces = recognizer.recognize_faces(rgb_frame)
-                except Exception as e:
-                    st.error(f"❌ **Face recognition error:** {e}")
-                    logging.error(f"Face recognition error: {e}")
+        try:
+            while grabber.is_running():
+                frame_id, frame, _ = grabber.wait_for_frame(last_frame_id)
+                if frame is None or frame_id == last_frame_id:
                     continue
+                last_frame_id = frame_id
+
+                start = time.perf_counter()
+                _, recognized_faces = pipeline.latest_results()
+                annotated = draw_faces(frame.copy(), recognized_faces)
+                video_placeholder.image(annotated, channels="BGR", use_container_width=True)
+                if not first_frame_shown:
+                    first_frame_shown = True
+                    metrics.histogram('fras_first_frame', "Live page open to first displayed frame").observe(
+                        time.perf_counter() - opened_at)
+                render_time = time.perf_counter() - start
+                render_stats.record(render_time)
+                metrics.histogram('fras_render', "Frame annotate and display time").observe(render_time)
+
+                if start - last_stats_update > 1.0:
+                    last_stats_update = start
+                    with stats_placeholder.container():
+                        st.dataframe(
+                            pd.DataFrame(pipeline.snapshot() + [render_stats.snapshot()]).round(1),
+                            hide_index=True
+                        )
+                        if tracker is not None:
+                            st.caption(f"Encodings skipped by tracking: {tracker.skip_rate():.0%}")
+                        if scheduler is not None:
+                            st.caption(f"Scene: {scheduler.mode}, frames skipped by motion scheduling: "
+                                       f"{scheduler.skip_rate():.0%}")
+
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+
+            if grabber.error:
+                st.error(f"❌ **{grabber.error}**")
+        finally:
+            grabber.stop()
+            pipeline.stop()
+            if tracker is not None:
+                tracker.reset()
+            cap.release()
+            cv2.destroyAllWindows()
 
-                for face in recognized_faces:
-                    (top, right, bottom, left) = face['location']
-                    name = face['name']
-                    cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                    cv2.putText(frame, name, (left, bottom + 10), cv2.FONT_HERSHEY_SIMPLEX, 0.60, (255,0,0,), 1)
+    except Exception as e:
+        st.error(f"❌ **Error during video capture:** {e}")
+        logging.error(f"Error during video capture: {e}")
 
-                video_placeholder.image(frame, channels="BGR", use_container_width=True)
+def show_service_stream(address):
+    # Thin-client view: frames and results come from recognition_service.py
+    try:
+        client = RecognitionServiceClient(address)
+    except (OSError, EOFError) as e:
+        st.error(f"❌ **Cannot reach recognition service at {address}:** {e}")
+        logging.error(f"Cannot reach recognition service at {address}: {e}")
+        return
 
-            frame_count += 1
-            time.sleep(0.03)
+    try:
+        cameras = client.cameras()
+        columns = st.columns(min(len(cameras), 2) or 1)
+        placeholders = {camera_id: columns[i % len(columns)].empty() for i, camera_id in enumerate(cameras)}
+        st.write("ℹ️ **Stop the app to end the video stream.**")
+        last_sequence = {}
+        while True:
+            for camera_id, placeholder in placeholders.items():
+                latest = client.latest(camera_id)
+                if latest.get('jpeg') and latest['sequence'] != last_sequence.get(camera_id):
+                    last_sequence[camera_id] = latest['sequence']
+                    frame = cv2.imdecode(np.frombuffer(latest['jpeg'], dtype=np.uint8), cv2.IMREAD_COLOR)
+                    placeholder.image(frame, channels="BGR", caption=f"Camera {camera_id}: {cameras[camera_id]}",
+                                      use_container_width=True)
+            time.sleep(0.05)
+    except (OSError, EOFError, RuntimeError) as e:
+        st.error(f"❌ **Recognition service error:** {e}")
+        logging.error(f"Recognition service error: {e}")
+    finally:
+        client.close()
+
+
+def page_number(total, page_size, key):
+    pages = max(1, (total + page_size - 1) // page_size)
+    return int(st.number_input("🔢 **Page**", min_value=1, max_value=pages, value=1, key=key))
+
+
+def show_page(rows, page_size, key):
+    page = page_number(len(rows), page_size, key)
+    st.dataframe(pd.DataFrame(rows[(page - 1) * page_size:page * page_size]), hide_index=True)
+    st.caption(f"Showing page {page} of {(len(rows) + page_size - 1) // page_size} ({len(rows)} row(s)).")
+
+
+# Prepared exports live here until downloaded; files left behind by sessions that never
+# downloaded them (closed tabs, restarts) are removed once older than EXPORT_MAX_AGE seconds
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'fras_exports')
+EXPORT_MAX_AGE = 600
+EXPORT_KEYS = ('records_export', 'daily_export', 'members_export')
+
+
+def sweep_exports():
+    now = time.time()
+    try:
+        names = os.listdir(EXPORT_DIR)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > EXPORT_MAX_AGE:
+                os.remove(path)
+        except OSError:
+            pass
 
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
 
-        cap.release()
-        cv2.destroyAllWindows()
+def discard_export(key):
+    prepared = st.session_state.pop(key, None)
+    if prepared is not None:
+        try:
+            os.remove(prepared[1])
+        except OSError:
+            pass
+
+
+def download_csv(make_chunks, label, file_name, key, filter_key):
+    # Exports are only built when asked for: make_chunks() is streamed into a temporary
+    # file on "Prepare export" and kept for as long as filter_key (the filters plus the
+    # data version) stays the same. The file is dropped once it has been downloaded or
+    # the session leaves the records page, and swept once it is EXPORT_MAX_AGE old.
+    prepared = st.session_state.get(key)
+    if prepared is not None and (prepared[0] != filter_key or not os.path.exists(prepared[1])):
+        discard_export(key)  # Stale, or already swept for age
+        prepared = None
+    if prepared is None:
+        if not st.button("📦 **Prepare export**", key=f"{key}_prepare"):
+            return
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        with st.spinner("Preparing export..."), tempfile.NamedTemporaryFile('wb', suffix='.csv', dir=EXPORT_DIR,
+                                                                            delete=False) as export_file:
+            for chunk in make_chunks():
+                export_file.write(chunk.encode('utf-8'))
+        prepared = st.session_state[key] = (filter_key, export_file.name)
+    with open(prepared[1], 'rb') as export_file:
+        st.download_button(label, export_file, file_name, "text/csv", key=f"{key}_download",
+                           on_click=discard_export, args=(key,))
+
+
+def admin_credentials():
+    # A recognition service checks the admin password on every member change, so the
+    # password entered at authentication is sent along; a local recognizer takes none
+    if config.SERVICE_ADDRESS:
+        return {'admin_password': st.session_state.get('admin_password')}
+    return {}
+
+
+@st.cache_resource(show_spinner="Loading face recognizer...")
+def load_recognizer():
+    # Built once per server process and shared by every session and rerun. Admin
+    # changes made through the app update it in place; changes written by other
+    # processes (bulk_enroll.py, consolidation) are picked up by reload_if_changed.
+    # With a recognition service configured the app is a thin client: members and
+    # attendance are managed by the service, which owns the gallery.
+    if config.SERVICE_ADDRESS:
+        return RemoteRecognizer(config.SERVICE_ADDRESS)
+    with metrics.timed('fras_recognizer_init', "Recognizer construction and model warm-up time"):
+        recognizer = LiveFaceRecognizer(matcher=config.MATCHER, detection_scale=config.DETECTION_SCALE,
+                                        storage=config.MEMBER_STORAGE,
+                                        attendance_backend=config.ATTENDANCE_BACKEND, detector=config.DETECTOR,
+                                        cache_size=config.RECOGNITION_CACHE_SIZE, warm_report=True)
+        # Run the detector and encoder once so the first live frame does not pay for loading them
+        blank = np.zeros((64, 64, 3), dtype=np.uint8)
+        recognizer.detector.detect(blank)
+        fr.face_encodings(blank, [(0, 64, 64, 0)])
+    logging.info("LiveFaceRecognizer initialized successfully.")
+    return recognizer
 
-    except Exception as e:
-        st.error(f"❌ **Error during video capture:** {e}")
-        logging.error(f"Error during video capture: {e}")
 
 # ------------------------------
 # 1. Set Streamlit Page Configuration
@@ -85,14 +252,21 @@ logging.basicConfig(
 # 3. Initialize the Recognizer
 
 try:
-    recognizer = LiveFaceRecognizer()
+    recognizer = load_recognizer()
+    recognizer.reload_if_changed()
     st.write("✅ **Recognizer initialized successfully.**")
-    logging.info("LiveFaceRecognizer initialized successfully.")
+    metrics.histogram('fras_app_setup', "Rerun start to recognizer ready").observe(time.perf_counter() - rerun_start)
 except Exception as e:
     st.error(f"❌ **Failed to initialize LiveFaceRecognizer:** {e}")
     logging.error(f"Failed to initialize LiveFaceRecognizer: {e}")
     st.stop()
 
+if config.METRICS_PORT:
+    try:
+        metrics.serve_prometheus(config.METRICS_PORT)
+    except OSError as e:
+        logging.error(f"Failed to start metrics endpoint on port {config.METRICS_PORT}: {e}")
+
 # Initialize session states
 if 'auth_add' not in st.session_state:
     st.session_state['auth_add'] = False
@@ -114,11 +288,17 @@ if 'delete_in_progress' not in st.session_state:
 app_mode = "Add New Member" if st.session_state['add_member_in_progress'] else (
     "Delete Member" if st.session_state['delete_in_progress'] else st.sidebar.selectbox(
         "📋 **Choose the App Mode**",
-        ["Run Live Face Recognition", "Add New Member", "View Stored Members", "View Attendance Records", "Delete Member"],
+        ["Run Live Face Recognition", "Add New Member", "View Stored Members", "View Attendance Records", "Delete Member",
+         "Diagnostics"],
         index=0
     )
 )
 
+sweep_exports()
+if app_mode != "View Attendance Records":
+    for key in EXPORT_KEYS:  # Leaving the records page drops this session's prepared exports
+        discard_export(key)
+
 st.sidebar.markdown("***This face recognize attendance system is made by Vishal Patwa***",unsafe_allow_html=True)
 # ------------------------------
 # 6. App Mode Logic
@@ -137,6 +317,7 @@ if app_mode == "Add New Member":
             try:
                 if recognizer.authenticate_admin(password):
                     st.session_state['auth_add'] = True
+                    st.session_state['admin_password'] = password
                     st.success("✅ **Authentication successful for adding member.**")
                     logging.info("Admin authenticated for adding member.")
                 else:
@@ -177,13 +358,17 @@ if app_mode == "Add New Member":
 
                     if st.button("📷 **Capture**", key=f"capture_button_{current_step}"):
                         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        face_locations = fr.face_locations(rgb_frame)
-                        face_encodings = fr.face_encodings(rgb_frame, face_locations)
-
-                        if len(face_encodings) == 1:
-                            st.session_state['captured_encodings'].append(face_encodings[0])
-                            st.success(f"✅ **Captured {angle} view successfully.**")
-                            st.session_state['current_step'] += 1
+                        face_locations = get_detector('hog').detect(rgb_frame)
+
+                        if len(face_locations) == 1:
+                            quality = score_capture(rgb_frame, face_locations[0], angle)
+                            if quality['ok']:
+                                face_encodings = fr.face_encodings(rgb_frame, face_locations)
+                                st.session_state['captured_encodings'].append(face_encodings[0])
+                                st.success(f"✅ **Captured {angle} view successfully.**")
+                                st.session_state['current_step'] += 1
+                            else:
+                                st.warning(f"⚠️ **Capture rejected: {'; '.join(quality['problems'])}. Please try again.**")
                         else:
                             st.warning("⚠️ **No face detected. Please try again.**")
                 except Exception as e:
@@ -215,9 +400,12 @@ if app_mode == "Add New Member":
                             st.error("❌ **This name is already registered.**")
                         else:
                             try:
-                                # Register the new member with name, roll number, and captured encodings
-                                recognizer.add_new_member(name, roll_no, st.session_state['captured_encodings'])
+                                # Register the new member with the distinct (optionally consolidated) captured encodings
+                                encodings = prepare_encodings(st.session_state['captured_encodings'])
+                                recognizer.add_new_member(name, roll_no, encodings, **admin_credentials())
                                 st.success(f"✅ **Member '{name}' with Roll Number '{roll_no}' registered successfully.**")
+                                st.caption(f"Stored {len(encodings)} of {len(st.session_state['captured_encodings'])} "
+                                           f"captured encodings.")
                                 logging.info(f"New member '{name}' with Roll Number '{roll_no}' registered successfully.")
                             except Exception as e:
                                 st.error(f"❌ **Failed to register member:** {e}")
@@ -237,9 +425,13 @@ if app_mode == "Add New Member":
                 # Read the uploaded image
                 image = Image.open(uploaded_file)
                 rgb_image = np.array(image)
-                face_encodings = fr.face_encodings(rgb_image)
+                face_locations = get_detector('hog').detect(rgb_image)
+                quality = score_capture(rgb_image, face_locations[0]) if len(face_locations) == 1 else None
+                face_encodings = fr.face_encodings(rgb_image, face_locations) if quality and quality['ok'] else []
 
-                if len(face_encodings) == 1:
+                if quality and not quality['ok']:
+                    st.warning(f"⚠️ **Image rejected: {'; '.join(quality['problems'])}. Please upload another photo.**")
+                elif len(face_encodings) == 1:
                     st.success("✅ **All required images have been captured.**")
                     # Collect both name and roll number
                     member_name = st.text_input("📝 **Enter the name of the new member:**")
@@ -261,7 +453,7 @@ if app_mode == "Add New Member":
                             else:
                                 try:
                                     # Register the new member with name, roll number, and captured encodings
-                                    recognizer.add_new_member(name, roll_no, face_encodings)
+                                    recognizer.add_new_member(name, roll_no, face_encodings, **admin_credentials())
                                     st.success(f"✅ **Member '{name}' with Roll Number '{roll_no}' registered successfully.**")
                                     logging.info(f"New member '{name}' with Roll Number '{roll_no}' registered successfully.")
                                 except Exception as e:
@@ -272,7 +464,12 @@ if app_mode == "Add New Member":
 # "Run Live Face Recognition" Mode
 elif app_mode == "Run Live Face Recognition":
     st.header("🔍 **Live Face Recognition**")
-    capture_video()
+    if config.SERVICE_ADDRESS:
+        show_service_stream(config.SERVICE_ADDRESS)
+        st.stop()
+    workers = st.sidebar.number_input("⚙️ **Recognition workers**", min_value=1, max_value=os.cpu_count() or 1,
+                                      value=min(config.PIPELINE_WORKERS, os.cpu_count() or 1))
+    capture_video(workers=int(workers))
 
 elif app_mode == "View Stored Members":
     st.header("👥 **Registered Members**")
@@ -285,6 +482,9 @@ elif app_mode == "View Stored Members":
                 st.write(f"- {member} ({status})")
         else:
             st.write("❌ **No members found.**")
+        if st.button("🔄 **Reload members from storage**"):
+            recognizer.reload_members()
+            st.rerun()
         logging.info("Displayed stored members.")
     except Exception as e:
         st.error(f"❌ **Error fetching members:** {e}")
@@ -293,14 +493,58 @@ elif app_mode == "View Stored Members":
 elif app_mode == "View Attendance Records":
     st.header("📋 **Attendance Records**")
     try:
-        attendance_records = recognizer.get_attendance_records()
-        if attendance_records:
-            df = pd.DataFrame(attendance_records)
-            st.dataframe(df)
-            csv = df.to_csv(index=False)
-            st.download_button("📥 Download Attendance CSV", csv, "attendance_records.csv", "text/csv")
+        members = recognizer.get_data()
+        filter_cols = st.columns(3)
+        date_range = filter_cols[0].date_input("📅 **Date range**", value=())
+        member_filter = filter_cols[1].selectbox("👤 **Member**", ["All"] + sorted(members))
+        page_size = filter_cols[2].selectbox("📄 **Rows per page**", [25, 50, 100, 500], index=1)
+
+        start_date = date_range[0].isoformat() if len(date_range) > 0 else None
+        end_date = date_range[-1].isoformat() if len(date_range) > 0 else None
+        roll_no = members[member_filter]['roll_no'] if member_filter != "All" else None
+
+        records_tab, daily_tab, members_tab = st.tabs(["🗂️ Records", "📆 Daily Summary", "👥 Member Summary"])
+        with records_tab:
+            total = recognizer.count_attendance_records(start_date, end_date, roll_no)
+            if total:
+                page = page_number(total, page_size, "records_page")
+                attendance_records = recognizer.get_attendance_records(
+                    start_date, end_date, roll_no, limit=page_size, offset=(page - 1) * page_size
+                )
+                st.dataframe(pd.DataFrame(attendance_records), hide_index=True)
+                st.caption(f"Showing page {page} of {(total + page_size - 1) // page_size} ({total} record(s)).")
+                download_csv(lambda: recognizer.export_attendance_csv(start_date, end_date, roll_no),
+                             "📥 Download Attendance CSV", "attendance_records.csv", "records_export",
+                             (start_date, end_date, roll_no, total))
+            else:
+                st.write("❌ **No attendance records found.**")
+
+        if recognizer.report_warm.is_set():
+            report = recognizer.get_attendance_report()
         else:
-            st.write("❌ **No attendance records found.**")
+            with st.spinner("Building attendance summaries..."):
+                report = recognizer.get_attendance_report()
+        with daily_tab:
+            daily = report.daily(start_date, end_date)
+            if daily:
+                st.caption(f"Late arrivals are marks after {config.LATE_AFTER}.")
+                show_page(daily, page_size, "daily_page")
+                download_csv(lambda: export_csv(daily, fieldnames=DAILY_FIELDS), "📥 Download Daily Summary",
+                             "attendance_daily_summary.csv", "daily_export", (start_date, end_date, report.cursor))
+            else:
+                st.write("❌ **No attendance records found.**")
+        with members_tab:
+            roster = {member['roll_no']: name for name, member in members.items()}
+            summary = [row for row in report.members(start_date, end_date, roster)
+                       if roll_no is None or row['Roll No'] == roll_no]
+            if summary:
+                st.caption("Attendance % counts the days in the range on which attendance was taken.")
+                show_page(summary, page_size, "members_page")
+                download_csv(lambda: export_csv(summary, fieldnames=MEMBER_FIELDS), "📥 Download Member Summary",
+                             "attendance_member_summary.csv", "members_export",
+                             (start_date, end_date, roll_no, report.cursor, len(roster)))
+            else:
+                st.write("❌ **No members found.**")
         logging.info("Displayed attendance records.")
     except Exception as e:
         st.error(f"❌ **Error fetching attendance records:** {e}")
@@ -317,6 +561,7 @@ elif app_mode == "Delete Member":
             try:
                 if recognizer.authenticate_admin(password):
                     st.session_state['auth_delete'] = True
+                    st.session_state['admin_password'] = password
                     st.session_state['delete_in_progress'] = True
                     st.success("✅ **Authentication successful for deleting member.**")
                     logging.info("Admin authenticated for deleting member.")
@@ -339,7 +584,7 @@ elif app_mode == "Delete Member":
                 member_to_delete = st.selectbox("Select a member to delete:", members.keys())
                 if st.button("🗑️ **Delete Member**"):
                     try:
-                        if recognizer.delete_member(member_to_delete):
+                        if recognizer.delete_member(member_to_delete, **admin_credentials()):
                             st.success(f"✅ **Member '{member_to_delete}' deleted successfully.**")
                             logging.info(f"Deleted member: {member_to_delete}")
 
@@ -353,4 +598,27 @@ elif app_mode == "Delete Member":
                 st.write("❌ **No members found.**")
         except Exception as e:
             st.error(f"❌ **Error fetching members for deletion:** {e}")
-            logging.error(f"Error fetching members for deletion: {e}")
\ No newline at end of file
+            logging.error(f"Error fetching members for deletion: {e}")
+
+elif app_mode == "Diagnostics":
+    st.header("🩺 **Diagnostics**")
+    st.button("🔄 **Refresh**")
+    histograms, counters = metrics.REGISTRY.snapshot()
+    if histograms:
+        st.write("**Stage timings** (rolling window of recent observations)")
+        st.dataframe(pd.DataFrame(histograms).round(2), hide_index=True)
+    else:
+        st.write("❌ **No timings recorded yet. Run live face recognition first.**")
+    if counters:
+        st.write("**Counters**")
+        st.dataframe(pd.DataFrame([{'counter': name, 'value': value} for name, value in counters.items()]),
+                     hide_index=True)
+    cache_lookups = counters.get('fras_recognition_cache_hits', 0) + counters.get('fras_recognition_cache_misses', 0)
+    if cache_lookups:
+        st.caption(f"Recognition cache hit rate: {counters.get('fras_recognition_cache_hits', 0) / cache_lookups:.0%} "
+                   f"of {cache_lookups} lookup(s).")
+    if config.METRICS_PORT:
+        st.caption(f"Prometheus metrics: http://127.0.0.1:{config.METRICS_PORT}/metrics")
+
+# Only reruns that reach the end are timed; the live video loop never does
+metrics.histogram('fras_app_rerun', "Full script rerun time").observe(time.perf_counter() - rerun_start)
@@ -0,0 +1,136 @@
+# attendance_report.py
+# Aggregates over the whole attendance history: per-day headcount and late
+# arrivals, and per-member attendance percentage. Rows are streamed from the
+# store in chunks and folded into compact numpy columns (one int32 day, one int32
+# member and one bool per row), so a refresh only reads rows appended since the
+# last one and multi-year histories of millions of rows stay cheap to query.
+import threading
+
+import numpy as np
+
+import config
+
+DAILY_FIELDS = ['Date', 'Headcount', 'Late Arrivals']
+MEMBER_FIELDS = ['Roll No', 'Name', 'Days Present', 'Attendance %', 'Late Arrivals']
+
+
+class AttendanceReport:
+    def __init__(self, store, late_after=config.LATE_AFTER):
+        self.store = store
+        self.late_after = late_after  # HH:MM:SS strings compare in time order
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.cursor = 0  # Store position up to which rows have been folded in
+        self.member_index = {}  # roll_no -> member column
+        self.names = []  # Latest name seen per member column
+        self.date_index = {}  # ISO date -> day column
+        self.dates = []
+        self.day = np.empty(0, dtype=np.int32)
+        self.member = np.empty(0, dtype=np.int32)
+        self.late = np.empty(0, dtype=bool)
+        self._seen = np.empty(0, dtype=np.int64)  # Sorted (day, member) keys, for dropping duplicate rows
+        self._rollup = None  # Cached per-day (headcount, late) arrays
+
+    def refresh(self):
+        # Folds in rows appended since the last refresh; returns how many were read
+        with self._lock:
+            if self.store.end_cursor() < self.cursor:
+                self._reset()  # The store was replaced or truncated
+            chunks = []
+            for rows, cursor in self.store.iter_chunks_since(self.cursor):
+                if rows:
+                    chunks.append(self._columns(rows))
+                self.cursor = cursor
+            if chunks:
+                self._merge(*(np.concatenate(column) for column in zip(*chunks)))
+                self._rollup = None
+            return sum(len(days) for days, _, _ in chunks)
+
+    def _lookup(self, values, index, labels):
+        # Maps a column of strings to int32 ids, growing index/labels with unseen values
+        unique, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        ids = np.empty(len(unique), dtype=np.int32)
+        for i, value in enumerate(unique.tolist()):
+            ids[i] = index.get(value, -1)
+            if ids[i] < 0:
+                ids[i] = index[value] = len(labels)
+                labels.append(value)
+        return ids[inverse.reshape(-1)], unique, inverse.reshape(-1)
+
+    def _columns(self, rows):
+        roll_nos, names, dates, times = zip(*rows)
+        members, unique_roll_nos, inverse = self._lookup(roll_nos, self.member_index, self.names)
+        # Keep the latest name seen for each roll number (new members start out labelled by roll number)
+        last = np.zeros(len(unique_roll_nos), dtype=np.int64)
+        np.maximum.at(last, inverse, np.arange(len(rows)))
+        for member, row in zip(members[last].tolist(), last.tolist()):
+            self.names[member] = names[row]
+        days, _, _ = self._lookup(dates, self.date_index, self.dates)
+        return days, members, np.asarray(times, dtype=str) > self.late_after
+
+    def _merge(self, days, members, late):
+        # A member counts once per day, with their first row of that day
+        keys = (days.astype(np.int64) << 32) | members
+        keys, first = np.unique(keys, return_index=True)
+        position = np.searchsorted(self._seen, keys)
+        seen = position < len(self._seen)
+        seen[seen] = self._seen[position[seen]] == keys[seen]
+        self._seen = np.insert(self._seen, position[~seen], keys[~seen])
+        first = np.sort(first[~seen])
+        self.day = np.concatenate([self.day, days[first]])
+        self.member = np.concatenate([self.member, members[first]])
+        self.late = np.concatenate([self.late, late[first]])
+
+    def _daily_rollup(self):
+        if self._rollup is None:
+            headcount = np.bincount(self.day, minlength=len(self.dates))
+            late = np.bincount(self.day, weights=self.late, minlength=len(self.dates)).astype(np.int64)
+            self._rollup = headcount, late
+        return self._rollup
+
+    def _days_in_range(self, start_date, end_date):
+        dates = np.asarray(self.dates, dtype=str)
+        in_range = np.ones(len(dates), dtype=bool)
+        if start_date:
+            in_range &= dates >= start_date
+        if end_date:
+            in_range &= dates <= end_date
+        return dates, in_range
+
+    def daily(self, start_date=None, end_date=None):
+        # One row per day with any attendance, in date order
+        with self._lock:
+            headcount, late = self._daily_rollup()
+            dates, in_range = self._days_in_range(start_date, end_date)
+        order = np.flatnonzero(in_range)
+        order = order[np.argsort(dates[order])]
+        return [{'Date': str(dates[i]), 'Headcount': int(headcount[i]), 'Late Arrivals': int(late[i])} for i in order]
+
+    def members(self, start_date=None, end_date=None, roster=None):
+        # Attendance % is days present over days in the range on which anyone attended.
+        # roster ({roll_no: name}) adds enrolled members who were never marked.
+        with self._lock:
+            headcount, _ = self._daily_rollup()
+            _, in_range = self._days_in_range(start_date, end_date)
+            sessions = int(np.count_nonzero(in_range & (headcount > 0)))
+            rows = in_range[self.day]
+            present = np.bincount(self.member[rows], minlength=len(self.names))
+            late = np.bincount(self.member[rows], weights=self.late[rows], minlength=len(self.names)).astype(np.int64)
+            member_index, names = dict(self.member_index), list(self.names)
+
+        report = {}
+        for roll_no, name in (roster or {}).items():
+            report[roll_no] = {'Roll No': roll_no, 'Name': name, 'Days Present': 0, 'Attendance %': 0.0,
+                               'Late Arrivals': 0}
+        for roll_no, member in member_index.items():
+            if present[member] or roll_no in report:
+                report[roll_no] = {
+                    'Roll No': roll_no,
+                    'Name': report[roll_no]['Name'] if roll_no in report else names[member],
+                    'Days Present': int(present[member]),
+                    'Attendance %': round(100.0 * int(present[member]) / sessions, 1) if sessions else 0.0,
+                    'Late Arrivals': int(late[member]),
+                }
+        return [report[roll_no] for roll_no in sorted(report)]
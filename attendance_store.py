@@ -0,0 +1,283 @@
+# attendance_store.py
+import argparse
+import csv
+import io
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from itertools import islice
+
+FIELDS = ['Roll No', 'Name', 'Date', 'Time']
+
+
+def _matches(row, start_date, end_date, roll_no, name):
+    # Dates are ISO strings, so string comparison orders them correctly
+    if start_date and row['Date'] < start_date:
+        return False
+    if end_date and row['Date'] > end_date:
+        return False
+    if roll_no and row['Roll No'] != roll_no:
+        return False
+    if name and row['Name'] != name:
+        return False
+    return True
+
+
+class CsvAttendanceStore:
+    # attendance.csv; queries are full scans
+
+    def __init__(self, attendance_file, fsync=True):
+        self.attendance_file = attendance_file
+        self.fsync = fsync
+
+    def initialize(self):
+        if not os.path.exists(self.attendance_file):
+            with open(self.attendance_file, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(FIELDS)
+            logging.info(f"Attendance file '{self.attendance_file}' created.")
+        else:
+            logging.info(f"Attendance file '{self.attendance_file}' found.")
+
+    def marked_on(self, date_string):
+        marked = set()
+        for row in self._rows():
+            if row['Date'] == date_string:
+                marked.add(row['Roll No'])
+        return marked
+
+    def append(self, rows):
+        with open(self.attendance_file, 'a', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerows(rows)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        return len(rows)
+
+    def _rows(self):
+        if not os.path.exists(self.attendance_file):
+            return
+        with open(self.attendance_file, 'r', newline='') as f:
+            yield from csv.DictReader(f)
+
+    def iter_records(self, start_date=None, end_date=None, roll_no=None, name=None):
+        for row in self._rows():
+            if _matches(row, start_date, end_date, roll_no, name):
+                yield row
+
+    def query(self, start_date=None, end_date=None, roll_no=None, name=None, limit=None, offset=0):
+        records = self.iter_records(start_date, end_date, roll_no, name)
+        stop = None if limit is None else offset + limit
+        return list(islice(records, offset, stop))
+
+    def count(self, start_date=None, end_date=None, roll_no=None, name=None):
+        return sum(1 for _ in self.iter_records(start_date, end_date, roll_no, name))
+
+    def end_cursor(self):
+        return os.path.getsize(self.attendance_file) if os.path.exists(self.attendance_file) else 0
+
+    def iter_chunks_since(self, cursor=0, block_size=1 << 20):
+        # Yields (rows, cursor) for complete rows appended after byte offset `cursor`;
+        # rows are [roll_no, name, date, time] and a partly written last line is left for next time
+        if not os.path.exists(self.attendance_file):
+            return
+        with open(self.attendance_file, 'rb') as f:
+            skip_header = cursor == 0
+            f.seek(cursor)
+            while True:
+                block = f.read(block_size)
+                end = block.rfind(b'\n')
+                if end < 0:
+                    return
+                cursor += end + 1
+                f.seek(cursor)
+                lines = block[:end + 1].decode('utf-8').splitlines()
+                if skip_header:
+                    lines, skip_header = lines[1:], False
+                yield [row for row in csv.reader(lines) if len(row) == len(FIELDS)], cursor
+
+    def close(self):
+        pass
+
+
+class SqliteAttendanceStore:
+    # One row per member per day; UNIQUE(roll_no, date) makes repeated marks no-ops
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        # The background attendance writer and the UI thread share this connection
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+
+    def initialize(self):
+        with self._lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS attendance (
+                    id INTEGER PRIMARY KEY,
+                    roll_no TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    time TEXT NOT NULL,
+                    UNIQUE (roll_no, date)
+                );
+                CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date);
+            """)
+        logging.info(f"Attendance database '{self.db_file}' ready.")
+
+    def marked_on(self, date_string):
+        with self._lock:
+            rows = self.conn.execute("SELECT roll_no FROM attendance WHERE date = ?", (date_string,)).fetchall()
+        return {roll_no for (roll_no,) in rows}
+
+    def append(self, rows):
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO attendance (roll_no, name, date, time) VALUES (?, ?, ?, ?)", rows)
+            return self.conn.total_changes - before
+
+    def _where(self, start_date, end_date, roll_no, name):
+        clauses, params = [], []
+        if start_date:
+            clauses.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            clauses.append("date <= ?")
+            params.append(end_date)
+        if roll_no:
+            clauses.append("roll_no = ?")
+            params.append(roll_no)
+        if name:
+            clauses.append("name = ?")
+            params.append(name)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def iter_records(self, start_date=None, end_date=None, roll_no=None, name=None, chunk_size=5000):
+        # Keyset pagination on id so the lock is only held while a chunk is fetched
+        where, params = self._where(start_date, end_date, roll_no, name)
+        where = where + (" AND" if where else " WHERE") + " id > ?"
+        last_id = 0
+        while True:
+            with self._lock:
+                chunk = self.conn.execute(
+                    f"SELECT id, roll_no, name, date, time FROM attendance{where} ORDER BY id LIMIT ?",
+                    params + [last_id, chunk_size]
+                ).fetchall()
+            if not chunk:
+                return
+            for row_id, roll_no, name, date, time in chunk:
+                yield {'Roll No': roll_no, 'Name': name, 'Date': date, 'Time': time}
+            last_id = chunk[-1][0]
+
+    def query(self, start_date=None, end_date=None, roll_no=None, name=None, limit=None, offset=0):
+        where, params = self._where(start_date, end_date, roll_no, name)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT roll_no, name, date, time FROM attendance{where} ORDER BY date, time, id LIMIT ? OFFSET ?",
+                params + [-1 if limit is None else limit, offset]
+            ).fetchall()
+        return [dict(zip(FIELDS, row)) for row in rows]
+
+    def count(self, start_date=None, end_date=None, roll_no=None, name=None):
+        where, params = self._where(start_date, end_date, roll_no, name)
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM attendance{where}", params).fetchone()[0]
+
+    def end_cursor(self):
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM attendance").fetchone()[0]
+
+    def iter_chunks_since(self, cursor=0, chunk_size=50000):
+        # Yields (rows, cursor) for rows inserted after id `cursor`, in insertion order
+        while True:
+            with self._lock:
+                chunk = self.conn.execute(
+                    "SELECT id, roll_no, name, date, time FROM attendance WHERE id > ? ORDER BY id LIMIT ?",
+                    (cursor, chunk_size)
+                ).fetchall()
+            if not chunk:
+                return
+            cursor = chunk[-1][0]
+            yield [row[1:] for row in chunk], cursor
+
+    def import_csv(self, csv_file, batch_size=10000):
+        # Duplicate (roll_no, date) rows in the CSV are dropped by the constraint
+        imported = 0
+        with open(csv_file, 'r', newline='') as f:
+            reader = csv.DictReader(f)
+            while True:
+                batch = [(row['Roll No'], row['Name'], row['Date'], row['Time']) for row in islice(reader, batch_size)]
+                if not batch:
+                    break
+                imported += self.append(batch)
+        logging.info(f"Imported {imported} attendance row(s) from '{csv_file}' into '{self.db_file}'.")
+        return imported
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def export_csv(records, chunk_size=1000, fieldnames=FIELDS):
+    # Yields CSV text in chunks so exports never hold the whole table in memory
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    for i, record in enumerate(records, 1):
+        writer.writerow(record)
+        if i % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def create_attendance_store(backend, attendance_file):
+    if backend == 'csv':
+        return CsvAttendanceStore(attendance_file)
+    if backend == 'sqlite':
+        db_file = os.path.splitext(attendance_file)[0] + '.db'
+        first_run = not os.path.exists(db_file)
+        store = SqliteAttendanceStore(db_file)
+        store.initialize()
+        if first_run and os.path.exists(attendance_file):
+            store.import_csv(attendance_file)
+        return store
+    raise ValueError(f"Unknown attendance backend '{backend}'. Choose from: csv, sqlite")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Attendance store maintenance.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help="Import attendance.csv into the SQLite store")
+    import_parser.add_argument('csv_file', nargs='?', default='attendance.csv')
+    import_parser.add_argument('--db', help="SQLite file (default: next to the CSV)")
+    export_parser = subparsers.add_parser('export', help="Stream the SQLite store out as CSV")
+    export_parser.add_argument('db', nargs='?', default='attendance.db')
+    export_parser.add_argument('--start-date')
+    export_parser.add_argument('--end-date')
+    export_parser.add_argument('--roll-no')
+    export_parser.add_argument('--output', help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == 'import':
+        store = SqliteAttendanceStore(args.db or os.path.splitext(args.csv_file)[0] + '.db')
+        store.initialize()
+        print(f"Imported {store.import_csv(args.csv_file)} row(s).")
+        store.close()
+    else:
+        store = SqliteAttendanceStore(args.db)
+        output = open(args.output, 'w', newline='') if args.output else sys.stdout
+        try:
+            for chunk in export_csv(store.iter_records(args.start_date, args.end_date, args.roll_no)):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+            store.close()
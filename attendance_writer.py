@@ -0,0 +1,133 @@
+# attendance_writer.py
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+import metrics
+
+_FLUSH = object()
+_STOP = object()
+STOP_RETRIES = 3  # Extra write attempts for rows still failing when the writer stops
+
+
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+
+
+class AttendanceWriter:
+    # Appends attendance rows to an attendance store from a background thread.
+    # write() only enqueues, so the video thread never waits on disk; rows are
+    # written in batches once batch_size rows are pending or flush_interval
+    # seconds have passed since the oldest pending row. The store makes each
+    # batch durable (fsync for CSV, a committed transaction for SQLite).
+
+    def __init__(self, store, batch_size=64, flush_interval=1.0, on_flush=None):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush  # Called on the writer thread after each batch reaches the store
+        self.rows_written = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='attendance-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, row):
+        if self._closed:
+            raise RuntimeError("AttendanceWriter is closed.")
+        self._queue.put(row)
+
+    def flush(self, timeout=None):
+        # Blocks until every row written before this call is on disk. Returns False if
+        # that failed (the rows stay queued and are retried) or the timeout expired.
+        if self._closed:
+            return True
+        request = _FlushRequest()
+        self._queue.put((_FLUSH, request))
+        return request.done.wait(timeout) and request.ok
+
+    def close(self, timeout=None):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        logging.info(f"Attendance writer closed after writing {self.rows_written} row(s).")
+
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            waiters = []
+            stop = item is _STOP
+            if isinstance(item, tuple) and item and item[0] is _FLUSH:
+                waiters.append(item[1])
+            elif item is not None and not stop:
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            # Drain whatever else is already queued into the same batch
+            while not stop and len(pending) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, tuple) and item and item[0] is _FLUSH:
+                    waiters.append(item[1])
+                else:
+                    pending.append(item)
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if pending and (stop or waiters or due or len(pending) >= self.batch_size):
+                if self._write_batch(pending):
+                    pending = []
+                    deadline = None
+                else:
+                    deadline = time.monotonic() + self.flush_interval  # Retry on the next interval
+            for waiter in waiters:
+                waiter.ok = not pending
+                waiter.done.set()
+            if stop:
+                if pending:
+                    self._write_on_stop(pending)
+                return
+
+    def _write_on_stop(self, rows):
+        # Rows that still fail at shutdown get a few more attempts, then are logged
+        # in full so they can be re-entered instead of silently lost
+        for _ in range(STOP_RETRIES):
+            time.sleep(self.flush_interval)
+            if self._write_batch(rows):
+                return
+        logging.error(f"Attendance writer stopped with {len(rows)} unwritten row(s): {rows}")
+
+    def _write_batch(self, rows):
+        try:
+            with metrics.timed('fras_attendance_flush', "Attendance batch write time"):
+                written = self.store.append(rows)
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Failed to write {len(rows)} attendance row(s): {e}")
+            return False
+        self.rows_written += written
+        logging.debug(f"Flushed {len(rows)} attendance row(s), {written} new.")
+        if self.on_flush is not None:
+            try:
+                self.on_flush()
+            except Exception as e:
+                logging.error(f"Attendance flush callback failed: {e}")
+        return True
@@ -0,0 +1,133 @@
+# batch_recognize.py
+# Headless recognition over a recorded video file or any OpenCV source URL.
+# The main process decodes frames while a process pool runs detection and
+# encoding on them; matching and attendance stay in the main process so the
+# gallery and attendance store are only opened once.
+#
+#   python batch_recognize.py lecture.mp4 --stride 15 --workers 6 \
+#       --session-start "2024-11-11 09:00:00" --results lecture_results.jsonl
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import cv2
+import face_recognition as fr
+
+import config
+from live_face_recognizer import LiveFaceRecognizer, scaled_face_locations
+
+
+def detect_and_encode(frame, detection_scale, detector):
+    # Runs in a worker process on a BGR frame; the detector is loaded once per worker
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    face_locations = scaled_face_locations(rgb_frame, detection_scale, detector)
+    return face_locations, fr.face_encodings(rgb_frame, face_locations)
+
+
+def read_frames(capture, stride):
+    # Yields (frame_index, position_seconds, frame) for every stride-th frame;
+    # skipped frames are only grabbed, not decoded into images
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    index = 0
+    while True:
+        if index % stride == 0:
+            ret, frame = capture.read()
+            if not ret:
+                return
+            position = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if position <= 0 and fps:
+                position = index / fps
+            yield index, position, frame
+        elif not capture.grab():
+            return
+        index += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run face recognition over a video file or stream.")
+    parser.add_argument('source', help="Video file path or OpenCV source URL")
+    parser.add_argument('--stride', type=int, default=5, help="Process every Nth frame")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--session-start', help="Wall-clock time of the first frame (YYYY-MM-DD HH:MM:SS); "
+                                                "attendance is timestamped from it. Defaults to now.")
+    parser.add_argument('--results', help="Write per-frame results as JSON lines to this file")
+    parser.add_argument('--no-attendance', action='store_true', help="Only recognise, do not mark attendance")
+    parser.add_argument('--data-file', default='face_data.pkl')
+    parser.add_argument('--attendance-file', default='attendance.csv')
+    args = parser.parse_args()
+
+    capture = cv2.VideoCapture(args.source)
+    if not capture.isOpened():
+        sys.exit(f"Cannot open video source: {args.source}")
+
+    session_start = datetime.strptime(args.session_start, "%Y-%m-%d %H:%M:%S") if args.session_start else datetime.now()
+    recognizer = LiveFaceRecognizer(data_file=args.data_file, attendance_file=args.attendance_file,
+                                    matcher=config.MATCHER, detection_scale=config.DETECTION_SCALE,
+                                    storage=config.MEMBER_STORAGE, attendance_backend=config.ATTENDANCE_BACKEND,
+                                    detector=config.DETECTOR, cache_size=config.RECOGNITION_CACHE_SIZE)
+    results_file = open(args.results, 'w') if args.results else None
+    seen = {}
+    frames = 0
+    start = time.perf_counter()
+
+    def handle(index, position, future):
+        face_locations, face_encodings = future.result()
+        if args.no_attendance:
+            names = [name for name, _ in recognizer.match_encodings(face_encodings)]
+        else:
+            when = session_start + timedelta(seconds=position)
+            names = [face['name'] for face in recognizer.identify_faces(face_locations, face_encodings, when=when)]
+        for name in names:
+            if name != "Unknown":
+                seen.setdefault(name, position)
+        if results_file:
+            results_file.write(json.dumps({
+                'frame': index,
+                'time': round(position, 3),
+                'faces': [{'location': list(loc), 'name': name} for loc, name in zip(face_locations, names)]
+            }) + "\n")
+
+    try:
+        # Workers are spawned, not forked: the recognizer above already runs the attendance
+        # writer thread and holds SQLite connections, which a forked child would inherit
+        # in whatever state they were in (ProcessPoolExecutor only starts its workers on
+        # the first submit, so creating the pool earlier would not avoid that)
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=mp.get_context('spawn')) as pool:
+            # Bounded in-flight window keeps decoded frames from piling up in memory
+            in_flight = deque()
+            for index, position, frame in read_frames(capture, args.stride):
+                in_flight.append((index, position, pool.submit(detect_and_encode, frame, config.DETECTION_SCALE,
+                                                               config.DETECTOR)))
+                frames += 1
+                if len(in_flight) >= args.workers * 2:
+                    handle(*in_flight.popleft())
+            while in_flight:
+                handle(*in_flight.popleft())
+    finally:
+        capture.release()
+        recognizer.close()
+        if results_file:
+            results_file.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {frames} frame(s) in {elapsed:.1f}s ({frames / elapsed if elapsed else 0:.1f} frames/sec, "
+          f"stride {args.stride}, {args.workers} worker(s)).")
+    for name, position in sorted(seen.items(), key=lambda item: item[1]):
+        print(f"  {name}: first seen at {position:.1f}s")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        filename='app.log',
+        filemode='a',
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_app_reruns.py
+# Drives app.py headlessly with Streamlit's AppTest and times what a user waits
+# for: startup to the first live frame, reopening the live page later in the
+# same server process, and ordinary reruns caused by widget interactions. The
+# webcam is replaced by FakeCamera (noise frames, no loop), so the live page
+# ends after a few frames instead of running forever.
+#
+#   python benchmarks/bench_app_reruns.py --members 5000 --attendance-rows 200000
+#   python benchmarks/bench_app_reruns.py --app /path/to/other/checkout/app.py
+#
+# Run each configuration in a fresh process: st.cache_resource lives as long as
+# the process does.
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time Streamlit reruns of the attendance app.")
+    parser.add_argument('--app', default=os.path.join(REPO, 'app.py'), help="app.py of the checkout to measure")
+    parser.add_argument('--data-dir', help="Directory with face_data.pkl and attendance.csv (copied, not modified); "
+                                           "synthetic data is generated when omitted")
+    parser.add_argument('--members', type=int, default=5000)
+    parser.add_argument('--attendance-rows', type=int, default=200000)
+    parser.add_argument('--interactions', type=int, default=10)
+    args = parser.parse_args()
+
+    app_dir = os.path.dirname(os.path.abspath(args.app))
+    sys.path.insert(0, app_dir)
+    sys.path.insert(1, os.path.join(REPO, 'benchmarks'))
+    from fake_camera import FakeCamera
+    from run_benchmarks import synthetic_members, write_attendance, write_members
+    from streamlit.testing.v1 import AppTest
+
+    first_read = []
+
+    class TimedCamera(FakeCamera):
+        def read(self):
+            if not first_read:
+                first_read.append(time.perf_counter())
+            return super().read()
+
+    cv2.VideoCapture = lambda *args, **kwargs: TimedCamera(None, fps=30, loop=False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.data_dir:
+            for name in ('face_data.pkl', 'attendance.csv'):
+                if os.path.exists(os.path.join(args.data_dir, name)):
+                    shutil.copy(os.path.join(args.data_dir, name), tmp)
+        else:
+            write_members(os.path.join(tmp, 'face_data.pkl'), synthetic_members(args.members))
+            write_attendance(os.path.join(tmp, 'attendance.csv'), args.attendance_rows)
+        os.chdir(tmp)  # The app opens its data files relative to the working directory
+
+        app = AppTest.from_file(os.path.abspath(args.app), default_timeout=600)
+        start = time.perf_counter()
+        app.run()  # Opens on the live page
+        startup_first_frame = first_read[0] - start if first_read else float('nan')
+
+        rerun_times = []
+        for i in range(args.interactions):
+            app.sidebar.selectbox[0].select("Add New Member" if i % 2 == 0 else "Diagnostics")
+            start = time.perf_counter()
+            app.run()
+            rerun_times.append(time.perf_counter() - start)
+
+        app.sidebar.selectbox[0].select("Run Live Face Recognition")
+        first_read.clear()
+        start = time.perf_counter()
+        app.run()
+        reopen_first_frame = first_read[0] - start if first_read else float('nan')
+        if app.exception:
+            sys.exit(f"App raised: {app.exception}")
+
+    print(f"app: {args.app}")
+    print(f"startup to first live frame:   {1000 * startup_first_frame:8.0f} ms")
+    print(f"reopen live page, first frame: {1000 * reopen_first_frame:8.0f} ms")
+    print(f"interaction rerun p50 / max:   {1000 * np.median(rerun_times):8.0f} / {1000 * max(rerun_times):.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_detection_scale.py
+# Accuracy/latency comparison of downscaled face detection on a set of test images.
+#
+#   python benchmarks/bench_detection_scale.py path/to/images --scales 1.0 0.75 0.5 0.25
+#
+# Full-resolution detection is the reference: for every scale the script reports
+# detection latency, detect+encode latency, box recall against the reference
+# (IoU >= 0.5) and how far the resulting encodings drift from the reference
+# encodings. If images are stored in one folder per member and --data-file points
+# at a face_data.pkl containing those members, identification accuracy is
+# reported as well.
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import cv2
+import numpy as np
+import face_recognition as fr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from face_matcher import ExactMatcher  # noqa: E402
+from face_tracker import box_iou  # noqa: E402
+from live_face_recognizer import scaled_face_locations  # noqa: E402
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def load_images(root):
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(dirpath, filename)
+                image = cv2.imread(path)
+                if image is None:
+                    continue
+                label = os.path.basename(dirpath) if dirpath != root else None
+                yield path, label, cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def load_matcher(data_file):
+    with open(data_file, 'rb') as f:
+        members = pickle.load(f)['members']
+    matcher = ExactMatcher()
+    matcher.build({name: data['encodings'] for name, data in members.items() if data['active']})
+    return matcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare face detection accuracy and latency across scales.")
+    parser.add_argument('images', help="Directory of test images (optionally one sub-folder per member)")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.75, 0.5, 0.25])
+    parser.add_argument('--model', default='hog', help="Detector backend (see face_detector.DETECTORS)")
+    parser.add_argument('--data-file', help="face_data.pkl used to measure identification accuracy")
+    parser.add_argument('--tolerance', type=float, default=0.6)
+    args = parser.parse_args()
+
+    images = list(load_images(args.images))
+    if not images:
+        sys.exit(f"No images found under {args.images}")
+    matcher = load_matcher(args.data_file) if args.data_file else None
+
+    # Reference pass at full resolution
+    references = []
+    for _, _, image in images:
+        locations = scaled_face_locations(image, 1.0, args.model)
+        references.append((locations, fr.face_encodings(image, locations)))
+
+    print(f"{len(images)} image(s), {sum(len(loc) for loc, _ in references)} reference face(s)")
+    print(f"{'scale':>6} {'detect ms':>10} {'total ms':>9} {'recall':>7} {'extra':>6} {'drift':>7} {'id acc':>7}")
+    for scale in args.scales:
+        detect_times, total_times, drifts = [], [], []
+        found = extra = labelled = correct = 0
+        for (_, label, image), (ref_locations, ref_encodings) in zip(images, references):
+            start = time.perf_counter()
+            locations = scaled_face_locations(image, scale, args.model)
+            detected = time.perf_counter()
+            encodings = fr.face_encodings(image, locations)
+            total_times.append(time.perf_counter() - start)
+            detect_times.append(detected - start)
+
+            matched = set()
+            for ref_box, ref_encoding in zip(ref_locations, ref_encodings):
+                overlaps = [(box_iou(ref_box, box), i) for i, box in enumerate(locations) if i not in matched]
+                best = max(overlaps, default=(0.0, None))
+                if best[0] >= 0.5:
+                    found += 1
+                    matched.add(best[1])
+                    drifts.append(float(np.linalg.norm(encodings[best[1]] - ref_encoding)))
+            extra += len(locations) - len(matched)
+
+            if matcher is not None and label is not None:
+                labelled += 1
+                names = [name for name, distance in matcher.search(encodings) if distance <= args.tolerance]
+                correct += label in names
+
+        reference_faces = sum(len(loc) for loc, _ in references)
+        recall = found / reference_faces if reference_faces else 0.0
+        accuracy = f"{correct / labelled:.3f}" if labelled else "-"
+        print(f"{scale:>6.2f} {1000 * np.mean(detect_times):>10.1f} {1000 * np.mean(total_times):>9.1f} "
+              f"{recall:>7.3f} {extra:>6} {np.mean(drifts) if drifts else 0.0:>7.4f} {accuracy:>7}")
+
+
+if __name__ == '__main__':
+    main()
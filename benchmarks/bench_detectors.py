@@ -0,0 +1,110 @@
+# benchmarks/bench_detectors.py
+# Speed and recall of the face detector backends on a local image set.
+#
+#   python benchmarks/bench_detectors.py path/to/images --backends hog haar dnn
+#   python benchmarks/bench_detectors.py path/to/images --annotations boxes.csv --scale 0.5
+#
+# Recall is measured against hand-labelled boxes when --annotations is given (CSV
+# with columns image,top,right,bottom,left; image paths relative to the image
+# directory), otherwise against the --reference backend. Backends draw boxes of
+# different shapes around the same face, so a detection counts as a match at a
+# looser IoU than bench_detection_scale.py uses. "encodable" is the share of
+# matched boxes that still produce an encoding within --tolerance of the
+# reference box's encoding, i.e. boxes that are usable for recognition.
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import defaultdict
+
+import face_recognition as fr
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_detection_scale import load_images  # noqa: E402
+from face_detector import DETECTORS, create_detector  # noqa: E402
+from face_tracker import box_iou  # noqa: E402
+from live_face_recognizer import scaled_face_locations  # noqa: E402
+
+
+def read_annotations(annotations_file, root):
+    boxes = defaultdict(list)
+    with open(annotations_file, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            path = os.path.normpath(os.path.join(root, row['image']))
+            boxes[path].append(tuple(int(row[key]) for key in ('top', 'right', 'bottom', 'left')))
+    return boxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare face detector backends on a set of images.")
+    parser.add_argument('images', help="Directory of test images")
+    parser.add_argument('--backends', nargs='+', default=['hog', 'haar', 'dnn'], choices=list(DETECTORS))
+    parser.add_argument('--reference', default='hog', choices=list(DETECTORS),
+                        help="Backend whose boxes count as ground truth when there are no annotations")
+    parser.add_argument('--annotations', help="CSV of ground-truth boxes: image,top,right,bottom,left")
+    parser.add_argument('--scale', type=float, default=1.0, help="Detection scale, as FRAS_DETECTION_SCALE")
+    parser.add_argument('--iou', type=float, default=0.3, help="Minimum IoU for a detection to match a face")
+    parser.add_argument('--tolerance', type=float, default=0.6)
+    parser.add_argument('--repeat', type=int, default=1, help="Timed passes over the image set")
+    args = parser.parse_args()
+
+    images = [(os.path.normpath(path), image) for path, _, image in load_images(args.images)]
+    if not images:
+        sys.exit(f"No images found under {args.images}")
+
+    if args.annotations:
+        annotated = read_annotations(args.annotations, args.images)
+        references = [annotated.get(path, []) for path, _ in images]
+        source = args.annotations
+    else:
+        reference = create_detector(args.reference)
+        references = [reference.detect(image) for _, image in images]
+        source = f"'{args.reference}' detector"
+    reference_encodings = [fr.face_encodings(image, boxes) for (_, image), boxes in zip(images, references)]
+    total_faces = sum(len(boxes) for boxes in references)
+    print(f"{len(images)} image(s), {total_faces} reference face(s) from {source}, detection scale {args.scale}")
+
+    print(f"{'backend':<8} {'ms/image':>9} {'images/s':>9} {'dets/s':>8} {'recall':>7} {'extra':>6} {'encodable':>10}")
+    for name in args.backends:
+        try:
+            detector = create_detector(name)
+        except (FileNotFoundError, OSError) as e:
+            print(f"{name:<8} skipped: {e}")
+            continue
+        scaled_face_locations(images[0][1], args.scale, detector)  # Warm-up (model loading)
+
+        detections, elapsed = [], 0.0
+        for _ in range(args.repeat):
+            detections = []
+            start = time.perf_counter()
+            for _, image in images:
+                detections.append(scaled_face_locations(image, args.scale, detector))
+            elapsed += time.perf_counter() - start
+
+        found = extra = encodable = 0
+        for (_, image), boxes, reference_boxes, encodings in zip(images, detections, references, reference_encodings):
+            matched = {}
+            for ref, ref_box in enumerate(reference_boxes):
+                overlaps = [(box_iou(ref_box, box), i) for i, box in enumerate(boxes) if i not in matched.values()]
+                best = max(overlaps, default=(0.0, None))
+                if best[0] >= args.iou:
+                    matched[ref] = best[1]
+            found += len(matched)
+            extra += len(boxes) - len(matched)
+            if matched:
+                detected_encodings = fr.face_encodings(image, [boxes[i] for i in matched.values()])
+                for ref, encoding in zip(matched, detected_encodings):
+                    if ref < len(encodings) and np.linalg.norm(encoding - encodings[ref]) <= args.tolerance:
+                        encodable += 1
+
+        per_image = elapsed / (len(images) * args.repeat)
+        total_detections = sum(len(boxes) for boxes in detections) * args.repeat
+        print(f"{name:<8} {1000 * per_image:>9.1f} {1 / per_image if per_image else 0:>9.1f} "
+              f"{total_detections / elapsed if elapsed else 0:>8.1f} {found / total_faces if total_faces else 0:>7.3f} "
+              f"{extra:>6} {encodable / found if found else 0:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_matcher.py
+# Compares the IVF matcher against exact search on synthetic galleries.
+#
+#   python benchmarks/bench_matcher.py --sizes 1000 10000 100000 --n-probe 1 4 8 16
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from face_matcher import ExactMatcher, IVFMatcher  # noqa: E402
+
+
+def synthetic_gallery(n_identities, encodings_per_member, rng):
+    # Identity centres are ~0.9 apart and samples ~0.35 from their centre, which is
+    # roughly the spread of real dlib encodings.
+    centres = rng.normal(0, 0.9 / np.sqrt(256), size=(n_identities, 128)).astype(np.float32)
+    noise = rng.normal(0, 0.35 / np.sqrt(128), size=(n_identities, encodings_per_member, 128)).astype(np.float32)
+    members = {f"ID{i:06d}": centres[i] + noise[i] for i in range(n_identities)}
+    return centres, members
+
+
+def timed_queries(matcher, probes):
+    latencies, results = [], []
+    for probe in probes:
+        start = time.perf_counter()
+        results.append(matcher.search([probe])[0][0])
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exact vs IVF face matching.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    parser.add_argument('--encodings-per-member', type=int, default=1)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'identities':>10} {'backend':>14} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall@1':>9}")
+    for size in args.sizes:
+        centres, members = synthetic_gallery(size, args.encodings_per_member, rng)
+        truth_ids = rng.integers(0, size, size=args.queries)
+        probes = centres[truth_ids] + rng.normal(0, 0.35 / np.sqrt(128), size=(args.queries, 128)).astype(np.float32)
+
+        exact = ExactMatcher()
+        start = time.perf_counter()
+        exact.build(members)
+        exact.search(probes[:1])  # materialise the gallery matrix
+        build_time = time.perf_counter() - start
+        latencies, exact_results = timed_queries(exact, probes)
+        print(f"{size:>10} {'exact':>14} {build_time:>8.2f} {np.percentile(latencies, 50):>8.3f} "
+              f"{np.percentile(latencies, 95):>8.3f} {1.0:>9.3f}")
+
+        for n_probe in args.n_probe:
+            ivf = IVFMatcher(n_probe=n_probe, seed=args.seed)
+            start = time.perf_counter()
+            ivf.build(members)
+            build_time = time.perf_counter() - start
+            latencies, ivf_results = timed_queries(ivf, probes)
+            # Recall is measured against exact search, not ground truth, so it isolates index error
+            recall = np.mean([a == b for a, b in zip(ivf_results, exact_results)])
+            print(f"{size:>10} {f'ivf probe={n_probe}':>14} {build_time:>8.2f} {np.percentile(latencies, 50):>8.3f} "
+                  f"{np.percentile(latencies, 95):>8.3f} {recall:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_motion_scheduler.py
+# Replays a simulated kiosk day through the MotionScheduler on a virtual clock:
+# long stretches of an empty, slightly noisy corridor broken up by people walking
+# through. Reports the share of frames sent to recognition in each phase, the
+# recognition CPU time that implies, and the per-frame cost of the motion check.
+#
+#   python benchmarks/bench_motion_scheduler.py --fps 15 --work-ms 120 --cpu-budget 0.5
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from motion_scheduler import MotionScheduler  # noqa: E402
+
+
+def corridor(size=(480, 640)):
+    background = np.tile(np.linspace(60, 180, size[1], dtype=np.float32), (size[0], 1))
+    return np.repeat(background[:, :, None], 3, axis=2)
+
+
+def frame_at(background, rng, walker_x=None):
+    frame = background + rng.normal(0, 4, size=background.shape)  # Sensor noise
+    if walker_x is not None:
+        frame[120:420, walker_x:walker_x + 90] = 30
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the motion scheduler on a kiosk camera.")
+    parser.add_argument('--fps', type=float, default=15.0)
+    parser.add_argument('--work-ms', type=float, default=120.0, help="Simulated recognition time per frame")
+    parser.add_argument('--cpu-budget', type=float, default=1.0)
+    parser.add_argument('--idle-interval', type=float, default=2.0)
+    parser.add_argument('--idle-seconds', type=float, default=120.0, help="Length of each empty-corridor stretch")
+    parser.add_argument('--walks', type=int, default=5, help="People walking through")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    background = corridor()
+    scheduler = MotionScheduler(idle_interval=args.idle_interval, cpu_budget=args.cpu_budget)
+    work = args.work_ms / 1000
+    clock = 0.0
+    phases = {'idle': [0, 0], 'walking': [0, 0]}  # [frames, processed]
+    check_time = 0.0
+    frames = 0
+
+    def step(frame, phase, faces):
+        nonlocal clock, check_time, frames
+        start = time.perf_counter()
+        process = scheduler.should_process(frame, now=clock)
+        check_time += time.perf_counter() - start
+        frames += 1
+        phases[phase][0] += 1
+        if process:
+            phases[phase][1] += 1
+            scheduler.record_result(work, faces, now=clock + work)
+        clock += 1 / args.fps
+
+    idle_frame_count = int(args.idle_seconds * args.fps)
+    for _ in range(args.walks):
+        for _ in range(idle_frame_count):
+            step(frame_at(background, rng), 'idle', 0)
+        for x in range(0, 550, 12):  # A few seconds crossing the frame
+            step(frame_at(background, rng, x), 'walking', 1)
+    for _ in range(idle_frame_count):
+        step(frame_at(background, rng), 'idle', 0)
+
+    print(f"{'phase':<10} {'frames':>8} {'processed':>10} {'share':>8}")
+    for phase, (count, processed) in phases.items():
+        print(f"{phase:<10} {count:>8} {processed:>10} {processed / count if count else 0:>8.1%}")
+    processed = sum(p for _, p in phases.values())
+    print(f"\nRecognition CPU: {processed * work / clock:.2f} cores on average "
+          f"(every frame would be {frames * work / clock:.2f}, budget {args.cpu_budget:.2f}).")
+    print(f"Motion check: {1000 * check_time / frames:.3f} ms per frame.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# benchmarks/fixtures/make_face_frames.py
+# Regenerates benchmarks/fixtures/faces/, the default frames for the recognition
+# benchmark. The face is scikit-image's data.astronaut() (Eileen Collins, NASA
+# photograph, public domain), cropped to head and shoulders (the suit's mission
+# patches otherwise register as faces) and composed into 640x480 camera-like
+# frames at several sizes, positions and lighting conditions, one with two faces.
+#
+#   pip install scikit-image && python benchmarks/fixtures/make_face_frames.py
+import os
+
+import cv2
+import numpy as np
+from skimage import data
+
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'faces')
+WIDTH, HEIGHT = 640, 480
+
+
+def place(frame, portrait, size, x, y):
+    frame[y:y + size, x:x + size] = cv2.resize(portrait, (size, size), interpolation=cv2.INTER_AREA)
+    return frame
+
+
+def background(value=110):
+    return np.full((HEIGHT, WIDTH, 3), value, dtype=np.uint8)
+
+
+def main():
+    portrait = cv2.cvtColor(data.astronaut()[0:300, 90:390], cv2.COLOR_RGB2BGR)
+    frames = {
+        'close': place(background(), portrait, 440, 100, 20),
+        'mid_left': place(background(90), cv2.flip(portrait, 1), 320, 30, 120),
+        'two_faces': place(place(background(), portrait, 300, 10, 150), cv2.flip(portrait, 1), 300, 330, 150),
+        'dim': (place(background(), portrait, 360, 240, 60) * 0.55).astype(np.uint8),
+        'far': place(background(130), portrait, 200, 380, 240),
+    }
+    os.makedirs(OUTPUT, exist_ok=True)
+    for name, frame in frames.items():
+        cv2.imwrite(os.path.join(OUTPUT, f"{name}.jpg"), frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    print(f"Wrote {len(frames)} frame(s) to {OUTPUT}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+# benchmarks/run_benchmarks.py
+# Benchmark harness for the recognition hot path. Runs offline on CPU with
+# synthetic galleries, synthetic attendance files and a FakeCamera in place of
+# the webcam, and reports latency percentiles and throughput per component.
+#
+#   python benchmarks/run_benchmarks.py                            # default sizes
+#   python benchmarks/run_benchmarks.py --quick                    # small sizes only
+#   python benchmarks/run_benchmarks.py --attendance-rows 10000 10000000
+#   python benchmarks/run_benchmarks.py --save-baseline baseline.json
+#   python benchmarks/run_benchmarks.py --compare baseline.json --threshold 0.2
+#
+# With --compare the run exits non-zero if any benchmark's p50 latency is more
+# than `threshold` slower than the baseline.
+#
+# The recognition and pipeline benchmarks default to the frames in
+# benchmarks/fixtures/faces (six faces over five frames; regenerate with
+# benchmarks/fixtures/make_face_frames.py), with that face enrolled, so they time
+# detection, encoding, matching and attendance rather than detection on empty
+# frames. --noise-frames restores face-free noise frames.
+import argparse
+import csv
+import json
+import logging
+import os
+import pickle
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from attendance_report import AttendanceReport  # noqa: E402
+from fake_camera import FakeCamera  # noqa: E402
+from live_face_recognizer import LiveFaceRecognizer  # noqa: E402
+from video_pipeline import FrameGrabber, RecognitionPipeline  # noqa: E402
+
+FACE_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'faces')
+
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'ops_per_sec': float(1000 / latencies.mean()) if latencies.mean() > 0 else 0.0,
+    }
+
+
+def synthetic_members(n_members, encodings_per_member=3, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0, 0.9 / np.sqrt(256), size=(n_members, 128))
+    return {
+        f"MEMBER {i:06d}": {
+            'roll_no': f"R{i:06d}",
+            'encodings': list(centres[i] + rng.normal(0, 0.35 / np.sqrt(128), size=(encodings_per_member, 128))),
+            'active': True
+        }
+        for i in range(n_members)
+    }
+
+
+def write_members(path, members):
+    with open(path, 'wb') as f:
+        pickle.dump({'members': members}, f)
+
+
+def write_attendance(path, rows, n_members=2000):
+    # Roughly one lecture's worth of members per day, going back in time
+    start = datetime(2020, 1, 1)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Roll No', 'Name', 'Date', 'Time'])
+        for i in range(rows):
+            member = i % n_members
+            day = start + timedelta(days=i // n_members)
+            writer.writerow([f"R{member:06d}", f"MEMBER {member:06d}", day.strftime("%Y-%m-%d"), "09:00:00"])
+
+
+class Benchmarks:
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.results = {}
+
+    def record(self, name, result):
+        self.results[name] = result
+        print(f"{name:<48} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} {result['p99_ms']:>10.3f} "
+              f"{result['ops_per_sec']:>12.1f}")
+
+    def recognizer(self, tag, members=None, **kwargs):
+        directory = os.path.join(self.workdir, tag)
+        os.makedirs(directory, exist_ok=True)
+        data_file = os.path.join(directory, 'face_data.pkl')
+        if members is not None:
+            write_members(data_file, members)
+        kwargs.setdefault('attendance_file', os.path.join(directory, 'attendance.csv'))
+        return LiveFaceRecognizer(data_file=data_file, **kwargs)
+
+    def matching(self):
+        rng = np.random.default_rng(1)
+        for size in self.args.gallery_sizes:
+            members = synthetic_members(size)
+            for matcher in self.args.matchers:
+                recognizer = self.recognizer(f"match-{matcher}-{size}", members, matcher=matcher)
+                for faces in (1, 5):
+                    probes = [members[f"MEMBER {i:06d}"]['encodings'][0] for i in rng.integers(0, size, faces)]
+                    self.record(f"match_encodings[{matcher}, {size} members, {faces} faces]",
+                                measure(lambda: recognizer.match_encodings(probes), self.args.repeat))
+                recognizer.close()
+
+    def recognition_cache(self):
+        # A busy hallway: a few people seen repeatedly, each sighting a slightly jittered encoding
+        rng = np.random.default_rng(2)
+        size = max(self.args.gallery_sizes)
+        members = synthetic_members(size)
+        people = [members[f"MEMBER {i:06d}"]['encodings'][0] for i in rng.integers(0, size, 20)]
+        sightings = [people[i] + rng.normal(0, 0.02 / np.sqrt(128), 128) for i in rng.integers(0, len(people), 5000)]
+        for cache_size in (0, 256):
+            recognizer = self.recognizer(f"cache-{cache_size}", members, cache_size=cache_size)
+            probes = iter(sightings * 10)
+            self.record(f"match_encodings[cache {cache_size or 'off'}, {size} members, repeat sightings]",
+                        measure(lambda: recognizer.match_encodings([next(probes)]), self.args.repeat))
+            if recognizer.recognition_cache is not None:
+                print(f"  recognition cache hit rate: {recognizer.recognition_cache.hit_rate():.1%}")
+            recognizer.close()
+
+    def camera_source(self):
+        return None if self.args.noise_frames else self.args.images
+
+    def enroll_fixture_face(self, recognizer, rgb_frames):
+        # Adds the face of the first frame that has one, so fixture faces are recognised
+        # and marked instead of all coming out Unknown
+        for frame in rgb_frames:
+            face_locations = recognizer.detect_faces(frame)
+            if face_locations:
+                recognizer.add_new_member("FIXTURE FACE", "R-FIXTURE", recognizer.encode_faces(frame, face_locations[:1]))
+                return
+
+    def recognition(self):
+        camera = FakeCamera(self.camera_source())
+        frames = [camera.read()[1][:, :, ::-1].copy() for _ in range(len(camera.frames))]
+        recognizer = self.recognizer('recognize', synthetic_members(1000))
+        self.enroll_fixture_face(recognizer, frames)
+        faces = sum(len(recognizer.detect_faces(frame)) for frame in frames)
+        cycle = iter(range(10 ** 9))
+        repeat = max(5, self.args.repeat // 20)
+        self.record(f"recognize_faces[{len(frames)} frame(s), {faces} face(s), 1000 members]",
+                    measure(lambda: recognizer.recognize_faces(frames[next(cycle) % len(frames)]), repeat))
+        recognizer.close()
+
+    def attendance_marking(self):
+        members = synthetic_members(max(self.args.repeat * 2, 100), encodings_per_member=1)
+        recognizer = self.recognizer('mark', members)
+        names = iter(members)
+        self.record("mark_attendance[new member]", measure(lambda: recognizer.mark_attendance(next(names)), self.args.repeat))
+        first = next(iter(members))
+        self.record("mark_attendance[repeat sighting]", measure(lambda: recognizer.mark_attendance(first), self.args.repeat))
+        recognizer.close()
+
+    def persistence(self):
+        for size in self.args.gallery_sizes:
+            members = synthetic_members(size)
+            for storage in ('pickle', 'mmap'):
+                tag = f"store-{storage}-{size}"
+                recognizer = self.recognizer(tag, members, storage=storage)
+                repeat = max(3, self.args.repeat // 20)
+                self.record(f"save_data[{storage}, {size} members]", measure(recognizer.save_data, repeat))
+                self.record(f"load_data[{storage}, {size} members]", measure(recognizer.load_data, repeat))
+                extra = iter(synthetic_members(repeat + 1, seed=size).items())
+
+                def add_one():
+                    name, member = next(extra)
+                    recognizer.add_new_member(name + " NEW", member['roll_no'], member['encodings'])
+                self.record(f"add_new_member[{storage}, {size} members]", measure(add_one, repeat))
+                recognizer.close()
+
+    def attendance_queries(self):
+        for rows in self.args.attendance_rows:
+            directory = os.path.join(self.workdir, f"attendance-{rows}")
+            os.makedirs(directory, exist_ok=True)
+            attendance_file = os.path.join(directory, 'attendance.csv')
+            write_attendance(attendance_file, rows)
+            for backend in self.args.attendance_backends:
+                members = synthetic_members(max(self.args.repeat, 100), encodings_per_member=1)
+                recognizer = self.recognizer(f"attendance-{rows}-{backend}", members, attendance_file=attendance_file,
+                                             attendance_backend=backend)
+                marks = iter(members)
+                repeat = max(3, self.args.repeat // 50)
+                if rows <= 1_000_000:
+                    self.record(f"get_attendance_records[{backend}, {rows} rows, all]",
+                                measure(recognizer.get_attendance_records, repeat))
+                self.record(f"get_attendance_records[{backend}, {rows} rows, page of 50]",
+                            measure(lambda: recognizer.get_attendance_records(roll_no="R000007", limit=50), repeat))
+                self.record(f"count_attendance_records[{backend}, {rows} rows, one day]",
+                            measure(lambda: recognizer.count_attendance_records("2020-01-02", "2020-01-02"), repeat))
+                if rows <= 1_000_000:
+                    self.record(f"attendance_report[{backend}, {rows} rows, cold refresh]",
+                                measure(lambda: AttendanceReport(recognizer.attendance_store).refresh(), 1, warmup=0))
+                report = recognizer.get_attendance_report()
+                self.record(f"attendance_report[{backend}, {rows} rows, member summary]",
+                            measure(lambda: report.members(), repeat))
+                self.record(f"attendance_report[{backend}, {rows} rows, refresh after one mark]",
+                            measure(lambda: (recognizer.mark_attendance(next(marks)), recognizer.get_attendance_report()),
+                                    repeat))
+                recognizer.close()
+
+    def pipeline(self):
+        recognizer = self.recognizer('pipeline', synthetic_members(1000))
+        camera = FakeCamera(self.camera_source(), fps=30)
+        self.enroll_fixture_face(recognizer, [frame[:, :, ::-1].copy() for frame in camera.frames])
+        grabber = FrameGrabber(camera).start()
+        pipeline = RecognitionPipeline(recognizer, grabber, workers=self.args.workers).start()
+        time.sleep(self.args.pipeline_seconds)
+        stats = {row['stage']: row for row in pipeline.snapshot()}
+        grabber.stop()
+        pipeline.stop()
+        recognizer.close()
+        end_to_end = stats['end_to_end']
+        self.record(f"pipeline[{self.args.workers} workers, end to end]", {
+            'p50_ms': end_to_end['latency_ms'],
+            'p95_ms': end_to_end['max_latency_ms'],
+            'p99_ms': end_to_end['max_latency_ms'],
+            'ops_per_sec': end_to_end['fps'],
+        })
+
+
+def compare(results, baseline_file, threshold):
+    with open(baseline_file) as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline or baseline[name]['p50_ms'] <= 0:
+            continue
+        change = result['p50_ms'] / baseline[name]['p50_ms'] - 1
+        if change > threshold:
+            regressions.append((name, baseline[name]['p50_ms'], result['p50_ms'], change))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {threshold:.0%}:")
+        for name, before, after, change in regressions:
+            print(f"  {name}: {before:.3f} ms -> {after:.3f} ms (+{change:.0%})")
+    else:
+        print(f"\nNo regressions beyond {threshold:.0%} against {baseline_file}.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recognition hot path.")
+    parser.add_argument('--only', nargs='+',
+                        choices=['matching', 'recognition_cache', 'recognition', 'attendance_marking', 'persistence',
+                                 'attendance_queries', 'pipeline'])
+    parser.add_argument('--quick', action='store_true', help="Small sizes for a fast smoke run")
+    parser.add_argument('--gallery-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--matchers', nargs='+', default=['exact', 'ivf'])
+    parser.add_argument('--attendance-rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--attendance-backends', nargs='+', default=['csv', 'sqlite'])
+    parser.add_argument('--images', default=FACE_FIXTURES,
+                        help="Directory of images/frames or a video file (default: benchmarks/fixtures/faces)")
+    parser.add_argument('--noise-frames', action='store_true', help="Use face-free synthetic noise frames instead")
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--pipeline-seconds', type=float, default=5.0)
+    parser.add_argument('--save-baseline', help="Write results to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON file to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+    if args.quick:
+        args.gallery_sizes = [100, 1000]
+        args.attendance_rows = [10000]
+        args.repeat = 50
+        args.pipeline_seconds = 2.0
+
+    # Keep per-frame recognizer logging out of the measurements and out of app.log
+    logging.getLogger().setLevel(logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix='fras-bench-')
+    benchmarks = Benchmarks(args, workdir)
+    print(f"{'benchmark':<48} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/sec':>12}")
+    try:
+        for name in args.only or ['matching', 'recognition_cache', 'recognition', 'attendance_marking',
+                                  'persistence', 'attendance_queries', 'pipeline']:
+            getattr(benchmarks, name)()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'platform': platform.platform(),
+                'python': platform.python_version(),
+                'results': benchmarks.results,
+            }, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}.")
+    if args.compare and compare(benchmarks.results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
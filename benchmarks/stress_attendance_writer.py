@@ -0,0 +1,66 @@
+# benchmarks/stress_attendance_writer.py
+# Pushes attendance events at the background writer from several threads and
+# checks that every row reached the CSV exactly once.
+#
+#   python benchmarks/stress_attendance_writer.py --events 20000 --threads 4
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from attendance_store import CsvAttendanceStore, SqliteAttendanceStore  # noqa: E402
+from attendance_writer import AttendanceWriter  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress test the batched attendance writer.")
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--flush-interval', type=float, default=0.05)
+    parser.add_argument('--backend', choices=['csv', 'sqlite'], default='csv')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'attendance.csv')
+        store = CsvAttendanceStore(path) if args.backend == 'csv' else SqliteAttendanceStore(os.path.join(tmp, 'attendance.db'))
+        store.initialize()
+
+        writer = AttendanceWriter(store, batch_size=args.batch_size, flush_interval=args.flush_interval)
+        per_thread = args.events // args.threads
+        enqueue_times = []
+
+        def producer(thread_id):
+            start = time.perf_counter()
+            for i in range(per_thread):
+                writer.write([f"R{thread_id:02d}{i:07d}", f"MEMBER {thread_id}-{i}", "2024-01-01", "09:00:00"])
+            enqueue_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=producer, args=(t,)) for t in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        produced = time.perf_counter() - start
+        writer.close()
+        total = time.perf_counter() - start
+
+        rows = [row['Roll No'] for row in store.iter_records()]
+        store.close()
+        expected = per_thread * args.threads
+        duplicates = len(rows) - len(set(rows))
+        lost = expected - len(set(rows))
+
+        print(f"events: {expected}, enqueue rate: {expected / produced:,.0f}/s, "
+              f"max per-thread enqueue time: {max(enqueue_times) * 1000:.1f} ms")
+        print(f"durable rate: {expected / total:,.0f}/s, rows on disk: {len(rows)}, lost: {lost}, duplicated: {duplicates}")
+        if lost or duplicates:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
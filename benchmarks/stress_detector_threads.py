@@ -0,0 +1,57 @@
+# benchmarks/stress_detector_threads.py
+# Runs one shared face detector backend from several threads at once, as the
+# live pipeline's and the recognition service's worker pools do, and checks
+# that every call returns the boxes of its own image (compared with a
+# single-threaded pass over the same frames).
+#
+#   python benchmarks/stress_detector_threads.py --threads 4 --calls 40
+#   python benchmarks/stress_detector_threads.py path/to/images --backend haar
+import argparse
+import os
+import sys
+import threading
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from face_detector import DETECTORS, get_detector  # noqa: E402
+from fake_camera import FakeCamera  # noqa: E402
+from run_benchmarks import FACE_FIXTURES  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a shared face detector under concurrent calls.")
+    parser.add_argument('images', nargs='?', default=FACE_FIXTURES, help="Directory of frames or a video file")
+    parser.add_argument('--backend', default='hog', choices=list(DETECTORS))
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--calls', type=int, default=40, help="Detections per thread")
+    args = parser.parse_args()
+
+    frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in FakeCamera(args.images).frames]
+    if not frames:
+        sys.exit(f"No frames found in {args.images}")
+    detector = get_detector(args.backend)
+    expected = [sorted(detector.detect(frame)) for frame in frames]
+    wrong = []
+
+    def worker(thread_id):
+        for call in range(args.calls):
+            i = (thread_id + call) % len(frames)
+            if sorted(detector.detect(frames[i])) != expected[i]:
+                wrong.append(i)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    total = args.threads * args.calls
+    print(f"backend: {args.backend}, {len(frames)} frame(s), {sum(map(len, expected))} face(s), "
+          f"{total} concurrent call(s) on {args.threads} thread(s), wrong boxes: {len(wrong)}")
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/stress_service_cameras.py
+# Runs the recognition service with several fake cameras, so frames from
+# different cameras are detected concurrently on the service's worker pool,
+# and checks each camera's published result against a single-threaded
+# detection of the frame it was computed from.
+#
+#   python benchmarks/stress_service_cameras.py --cameras 3 --seconds 30
+#   python benchmarks/stress_service_cameras.py path/to/images --workers 8
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config  # noqa: E402
+from face_detector import create_detector  # noqa: E402
+from live_face_recognizer import LiveFaceRecognizer, scaled_face_locations  # noqa: E402
+from recognition_service import RecognitionService  # noqa: E402
+from run_benchmarks import FACE_FIXTURES  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check recognition service results with several cameras.")
+    parser.add_argument('images', nargs='?', default=FACE_FIXTURES, help="Directory of frames or a video file")
+    parser.add_argument('--cameras', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=30.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recognizer = LiveFaceRecognizer(data_file=os.path.join(tmp, 'face_data.pkl'),
+                                        attendance_file=os.path.join(tmp, 'attendance.csv'),
+                                        detection_scale=config.DETECTION_SCALE, detector=config.DETECTOR)
+        service = RecognitionService([f"fake:{args.images}"] * args.cameras, recognizer, workers=args.workers,
+                                     address=('127.0.0.1', 0), authkey=os.urandom(16)).start()
+        dispatcher = threading.Thread(target=service.run_forever, daemon=True)
+        dispatcher.start()
+
+        # A detector of its own, used only from this thread, gives the expected boxes
+        reference = create_detector(config.DETECTOR)
+        seen, checked, wrong = {}, 0, 0
+        deadline = time.monotonic() + args.seconds
+        while time.monotonic() < deadline:
+            with service._lock:
+                latest = {camera_id: camera.latest for camera_id, camera in service.cameras.items()}
+            for camera_id, result in latest.items():
+                if result['frame'] is None or seen.get(camera_id) == result['sequence']:
+                    continue
+                seen[camera_id] = result['sequence']
+                rgb_frame = cv2.cvtColor(result['frame'], cv2.COLOR_BGR2RGB)
+                expected = sorted(scaled_face_locations(rgb_frame, recognizer.detection_scale, reference))
+                checked += 1
+                wrong += sorted(face['location'] for face in result['faces']) != expected
+            time.sleep(0.01)
+
+        service._running = False
+        dispatcher.join()
+        recognizer.close()
+
+    print(f"{args.cameras} camera(s), {args.workers} worker(s): {checked} result(s) checked, wrong boxes: {wrong}")
+    if wrong or not checked:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+# bulk_enroll.py
+# Enrolls a whole cohort from a directory tree with one folder of photos per member:
+#
+#   photos/
+#     john_doe/ 1.jpg 2.jpg ...
+#     jane_roe/ ...
+#
+# The manifest CSV maps folders to members: folder,name,roll_no (name defaults to
+# the folder name). Images are encoded across a process pool and every new member
+# is committed to the recognizer's store in a single write. Images failing the
+# enrollment quality gates are reported as failures, and each member's encodings
+# are de-duplicated (and consolidated if configured) before they are stored.
+#
+#   python bulk_enroll.py photos manifest.csv --workers 8
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import face_recognition as fr
+
+import config
+from enrollment_quality import prepare_encodings, score_capture
+from live_face_recognizer import LiveFaceRecognizer
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def read_manifest(manifest_file):
+    members = {}
+    with open(manifest_file, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            folder = row['folder'].strip()
+            name = (row.get('name') or folder).strip().upper()
+            roll_no = row['roll_no'].strip()
+            if not folder or not roll_no:
+                logging.warning(f"Skipping incomplete manifest row: {row}")
+                continue
+            members[folder] = (name, roll_no)
+    return members
+
+
+def encode_image(path, model='hog'):
+    # Runs in a worker process; returns (path, encoding or None, error or None)
+    try:
+        image = fr.load_image_file(path)
+        face_locations = fr.face_locations(image, model=model)
+        if len(face_locations) == 0:
+            return path, None, "no face detected"
+        if len(face_locations) > 1:
+            return path, None, f"{len(face_locations)} faces detected"
+        quality = score_capture(image, face_locations[0])
+        if not quality['ok']:
+            return path, None, "; ".join(quality['problems'])
+        return path, fr.face_encodings(image, face_locations)[0], None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def collect_images(root, manifest):
+    jobs = []
+    for folder in manifest:
+        folder_path = os.path.join(root, folder)
+        if not os.path.isdir(folder_path):
+            logging.warning(f"Manifest folder not found: {folder_path}")
+            continue
+        for dirpath, _, filenames in os.walk(folder_path):
+            for filename in sorted(filenames):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    jobs.append((folder, os.path.join(dirpath, filename)))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-enroll members from a directory of photos.")
+    parser.add_argument('root', help="Directory with one sub-folder of photos per member")
+    parser.add_argument('manifest', help="CSV with columns folder,name,roll_no")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--model', default='hog', choices=['hog', 'cnn'])
+    parser.add_argument('--data-file', default='face_data.pkl')
+    parser.add_argument('--storage', default=config.MEMBER_STORAGE, choices=['pickle', 'mmap'])
+    parser.add_argument('--failures', help="Write per-image failures to this CSV")
+    parser.add_argument('--dry-run', action='store_true', help="Encode and report without saving")
+    args = parser.parse_args()
+
+    manifest = read_manifest(args.manifest)
+    jobs = collect_images(args.root, manifest)
+    if not jobs:
+        sys.exit("No images found for the members in the manifest.")
+    print(f"Encoding {len(jobs)} image(s) for {len(manifest)} member(s) with {args.workers} worker(s)...")
+
+    encodings = {folder: [] for folder in manifest}
+    failures = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        folders = {path: folder for folder, path in jobs}
+        paths = [path for _, path in jobs]
+        chunksize = max(1, len(paths) // (args.workers * 4))
+        for path, encoding, error in pool.map(encode_image, paths, [args.model] * len(paths), chunksize=chunksize):
+            if error:
+                failures.append((path, error))
+            else:
+                encodings[folders[path]].append(encoding)
+    elapsed = time.perf_counter() - start
+
+    print(f"Encoded {len(jobs) - len(failures)}/{len(jobs)} image(s) in {elapsed:.1f}s "
+          f"({len(jobs) / elapsed:.1f} images/sec).")
+    for path, error in failures:
+        print(f"  FAILED {path}: {error}")
+    if args.failures and failures:
+        with open(args.failures, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['image', 'error'])
+            writer.writerows(failures)
+
+    new_members = {}
+    for folder, (name, roll_no) in manifest.items():
+        if encodings[folder]:
+            new_members[name] = (roll_no, prepare_encodings(encodings[folder]))
+        else:
+            print(f"  SKIPPED {name} (Roll No: {roll_no}): no usable images")
+
+    if args.dry_run:
+        print(f"Dry run: {len(new_members)} member(s) would be enrolled.")
+        return
+
+    # Same matcher as the app, so its saved index is updated rather than rebuilt on the next start
+    recognizer = LiveFaceRecognizer(data_file=args.data_file, storage=args.storage, matcher=config.MATCHER)
+    try:
+        added = recognizer.add_members(new_members)
+    finally:
+        recognizer.close()
+    for name in sorted(set(new_members) - set(added)):
+        print(f"  SKIPPED {name}: already registered")
+    print(f"Enrolled {len(added)} member(s).")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        filename='app.log',
+        filemode='a',
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    main()
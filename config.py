@@ -0,0 +1,90 @@
+# config.py
+# Deployment settings, overridable per kiosk through environment variables
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+# Worker threads running face detection/encoding in the live pipeline
+PIPELINE_WORKERS = _env_int('FRAS_PIPELINE_WORKERS', min(4, os.cpu_count() or 1))
+
+# Factor applied to frames before HOG detection (1.0 = full resolution).
+# See benchmarks/bench_detection_scale.py for the accuracy/latency trade-off.
+DETECTION_SCALE = _env_float('FRAS_DETECTION_SCALE', 1.0)
+
+# Carry identities across frames and only re-encode new or drifted faces
+FACE_TRACKING = _env_int('FRAS_FACE_TRACKING', 1) == 1
+
+# Member storage backend: 'pickle' (face_data.pkl) or 'mmap' (SQLite index + memory-mapped encodings)
+MEMBER_STORAGE = os.environ.get('FRAS_MEMBER_STORAGE', 'pickle')
+
+# Attendance backend: 'csv' (attendance.csv) or 'sqlite' (attendance.db, imported from the CSV on first use)
+ATTENDANCE_BACKEND = os.environ.get('FRAS_ATTENDANCE_BACKEND', 'csv')
+
+# Gallery search: 'exact' (brute force) or 'ivf' (inverted-file index, for large rosters).
+# FRAS_IVF_N_PROBE is the number of IVF cells scanned per query, trading recall for speed
+# (see benchmarks/bench_matcher.py); the index is written to disk at most every
+# FRAS_IVF_SAVE_DELAY seconds after a roster change
+MATCHER = os.environ.get('FRAS_MATCHER', 'exact')
+IVF_N_PROBE = _env_int('FRAS_IVF_N_PROBE', 8)
+IVF_SAVE_DELAY = _env_float('FRAS_IVF_SAVE_DELAY', 5.0)
+
+# Local port serving Prometheus metrics at /metrics (0 disables the endpoint); the app
+# and recognition_service.py both use it, so give the service --metrics-port on a shared host
+METRICS_PORT = _env_int('FRAS_METRICS_PORT', 0)
+
+# host:port of a running recognition_service.py; when set the app shows its cameras instead of opening one itself
+SERVICE_ADDRESS = os.environ.get('FRAS_SERVICE_ADDRESS', '')
+# Shared secret for service connections. There is no default: the connection unpickles
+# whatever it receives, so anyone holding the key can run code in the service.
+SERVICE_AUTHKEY = os.environ.get('FRAS_SERVICE_AUTHKEY', '').encode('utf-8')
+
+# Enrollment quality gates: minimum Laplacian variance of the face crop, minimum
+# face height/width in pixels, and maximum head yaw (nose offset / eye distance).
+# Wizard captures also check the pose against the requested angle: 'Center' must be
+# within FRAS_ENROLL_CENTER_MAX_YAW of frontal, turned angles at least
+# FRAS_ENROLL_MIN_TURN_YAW towards the requested side
+ENROLL_MIN_SHARPNESS = _env_float('FRAS_ENROLL_MIN_SHARPNESS', 40.0)
+ENROLL_MIN_FACE_SIZE = _env_int('FRAS_ENROLL_MIN_FACE_SIZE', 80)
+ENROLL_MAX_YAW = _env_float('FRAS_ENROLL_MAX_YAW', 0.6)
+ENROLL_CENTER_MAX_YAW = _env_float('FRAS_ENROLL_CENTER_MAX_YAW', 0.2)
+ENROLL_MIN_TURN_YAW = _env_float('FRAS_ENROLL_MIN_TURN_YAW', 0.1)
+
+# Encodings closer than this to one already kept for the member are dropped as duplicates
+ENROLL_DEDUP_DISTANCE = _env_float('FRAS_ENROLL_DEDUP_DISTANCE', 0.12)
+
+# Consolidate each member to at most this many centroids (0 keeps every distinct encoding)
+ENROLL_MAX_CENTROIDS = _env_int('FRAS_ENROLL_MAX_CENTROIDS', 0)
+
+# Motion-driven frame scheduling for the live pipeline and the recognition service:
+# a static scene is re-checked every FRAS_IDLE_INTERVAL seconds, motion (fraction of
+# changed thumbnail pixels) or new faces switch to every frame, and recognition is
+# kept within FRAS_CPU_BUDGET cores on average
+ADAPTIVE_SCHEDULING = _env_int('FRAS_ADAPTIVE_SCHEDULING', 1) == 1
+MOTION_THRESHOLD = _env_float('FRAS_MOTION_THRESHOLD', 0.01)
+IDLE_INTERVAL = _env_float('FRAS_IDLE_INTERVAL', 2.0)
+CPU_BUDGET = _env_float('FRAS_CPU_BUDGET', 1.0)
+
+# Attendance marked after this time of day (HH:MM:SS) counts as a late arrival in reports
+LATE_AFTER = os.environ.get('FRAS_LATE_AFTER', '09:15:00')
+
+# Face detector backend: 'hog' (dlib, default), 'cnn' (dlib, slow on CPU), 'haar' (OpenCV
+# cascade) or 'dnn' (OpenCV ResNet-10 SSD, needs the model files below).
+# See benchmarks/bench_detectors.py for the speed/recall comparison.
+DETECTOR = os.environ.get('FRAS_DETECTOR', 'hog')
+DNN_MODEL = os.environ.get('FRAS_DNN_MODEL', os.path.join('models', 'res10_300x300_ssd_iter_140000.caffemodel'))
+DNN_CONFIG = os.environ.get('FRAS_DNN_CONFIG', os.path.join('models', 'deploy.prototxt'))
+
+# Recent encoding -> identity cache in front of gallery matching: capacity (0 disables),
+# entry lifetime in seconds and the encoding distance within which a cached result is reused
+RECOGNITION_CACHE_SIZE = _env_int('FRAS_RECOGNITION_CACHE_SIZE', 256)
+RECOGNITION_CACHE_TTL = _env_float('FRAS_RECOGNITION_CACHE_TTL', 5.0)
+RECOGNITION_CACHE_RADIUS = _env_float('FRAS_RECOGNITION_CACHE_RADIUS', 0.1)
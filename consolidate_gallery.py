@@ -0,0 +1,105 @@
+# consolidate_gallery.py
+# Re-consolidates the encodings of already enrolled members: drops near-duplicate
+# encodings and optionally reduces each member to a few centroids. Before writing
+# anything it reports the gallery size reduction and the leave-one-out match rate
+# of the current and the consolidated gallery, so the trade-off can be checked.
+#
+#   python consolidate_gallery.py --max-centroids 3 --dry-run
+#   python consolidate_gallery.py --max-centroids 3
+import argparse
+import logging
+import sys
+
+import numpy as np
+
+import config
+from enrollment_quality import prepare_encodings
+from member_store import create_member_store
+
+
+def leave_one_out(members, strategy, tolerance):
+    # Every stored encoding of a member with 2+ encodings is used as a probe against
+    # a gallery built by `strategy` from everything else, with the probe's own member
+    # rebuilt from its remaining encodings. Returns (probes, correct, wrong).
+    names = list(members)
+    galleries = [np.asarray(strategy(members[name]['encodings'])) for name in names]
+    gallery = np.vstack(galleries)
+    offsets = np.cumsum([0] + [len(rows) for rows in galleries[:-1]])
+    probes = correct = wrong = 0
+    for own, name in enumerate(names):
+        encodings = np.asarray(members[name]['encodings'])
+        if len(encodings) < 2:
+            continue
+        for i, probe in enumerate(encodings):
+            distances = np.minimum.reduceat(np.linalg.norm(gallery - probe, axis=1), offsets)
+            remaining = np.asarray(strategy(np.delete(encodings, i, axis=0)))
+            distances[own] = np.min(np.linalg.norm(remaining - probe, axis=1))
+            best = int(np.argmin(distances))
+            probes += 1
+            if distances[best] <= tolerance:
+                if best == own:
+                    correct += 1
+                else:
+                    wrong += 1
+    return probes, correct, wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description="De-duplicate and consolidate enrolled members' encodings.")
+    parser.add_argument('--data-file', default='face_data.pkl')
+    parser.add_argument('--storage', default=config.MEMBER_STORAGE, choices=['pickle', 'mmap'])
+    parser.add_argument('--dedup-distance', type=float, default=config.ENROLL_DEDUP_DISTANCE)
+    parser.add_argument('--max-centroids', type=int, default=config.ENROLL_MAX_CENTROIDS,
+                        help="Centroids kept per member (0 only removes duplicates)")
+    parser.add_argument('--tolerance', type=float, default=0.6, help="Match tolerance used for the match-rate report")
+    parser.add_argument('--skip-evaluation', action='store_true', help="Skip the leave-one-out match-rate report")
+    parser.add_argument('--dry-run', action='store_true', help="Report without saving")
+    args = parser.parse_args()
+
+    store = create_member_store(args.storage, args.data_file)
+    try:
+        members = store.load()
+        if not members:
+            sys.exit("No members enrolled.")
+
+        def strategy(encodings):
+            return prepare_encodings(encodings, args.dedup_distance, args.max_centroids)
+
+        consolidated = {name: strategy(member['encodings']) for name, member in members.items()}
+        before = sum(len(member['encodings']) for member in members.values())
+        after = sum(len(encodings) for encodings in consolidated.values())
+        print(f"Gallery: {before} encoding(s) -> {after} encoding(s) for {len(members)} member(s) "
+              f"({1 - after / before if before else 0:.0%} smaller).")
+
+        if not args.skip_evaluation:
+            for label, evaluated in (("current", lambda encodings: encodings), ("consolidated", strategy)):
+                probes, correct, wrong = leave_one_out(members, evaluated, args.tolerance)
+                if probes:
+                    print(f"Leave-one-out match rate ({label}): {correct / probes:.1%} correct, "
+                          f"{wrong / probes:.1%} wrong member, {1 - (correct + wrong) / probes:.1%} unmatched "
+                          f"over {probes} probe(s).")
+                else:
+                    print("No member has 2+ encodings; skipping the match-rate report.")
+                    break
+
+        if args.dry_run:
+            print("Dry run: nothing saved.")
+            return
+        for name, encodings in consolidated.items():
+            members[name]['encodings'] = encodings
+        store.save_all(members)
+        logging.info(f"Consolidated gallery from {before} to {after} encodings.")
+        print("Saved. Running apps pick the change up on their next interaction; "
+              "a running recognition service needs its members reloaded.")
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        filename='app.log',
+        filemode='a',
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    main()
@@ -0,0 +1,115 @@
+# enrollment_quality.py
+# Quality gates and gallery shrinking for enrollment. Each capture is scored for
+# sharpness, face size and head pose before its encoding is accepted, and a
+# member's accepted encodings are de-duplicated and optionally consolidated to a
+# few k-means centroids so the matcher scans fewer rows per member.
+import cv2
+import face_recognition as fr
+import numpy as np
+
+import config
+from face_matcher import kmeans
+
+
+def _centre(points):
+    return np.mean(np.asarray(points, dtype=np.float64), axis=0)
+
+
+def estimate_pose(landmarks):
+    # From the 5-point ('small') landmarks: yaw is the nose tip's horizontal offset
+    # from the eye midpoint in units of eye distance (0 = frontal, about +-0.5 at a
+    # clear three-quarter view); roll is the eye line's angle in degrees
+    left_eye, right_eye = _centre(landmarks['left_eye']), _centre(landmarks['right_eye'])
+    nose = _centre(landmarks['nose_tip'])
+    eye_vector = right_eye - left_eye
+    eye_distance = float(np.hypot(*eye_vector)) or 1.0
+    yaw = float(nose[0] - (left_eye[0] + right_eye[0]) / 2) / eye_distance
+    roll = float(np.degrees(np.arctan2(eye_vector[1], eye_vector[0])))
+    if roll > 90:
+        roll -= 180
+    elif roll < -90:
+        roll += 180
+    return yaw, roll
+
+
+# Expected yaw direction for each enrollment wizard angle: 0 frontal, +1 turned to
+# the member's left (the nose moves towards the right of an unmirrored camera frame),
+# -1 to their right. 5-point landmarks give no usable pitch, so the upper and lower
+# views are only checked for their turn.
+ANGLE_YAW = {
+    'Center': 0,
+    'Left': 1,
+    'Right': -1,
+    'Upper Left': 1,
+    'Upper Right': -1,
+    'Lower Left': 1,
+    'Lower Right': -1,
+}
+
+
+def pose_problem(yaw, angle=None, max_yaw=config.ENROLL_MAX_YAW, center_max_yaw=config.ENROLL_CENTER_MAX_YAW,
+                 min_turn_yaw=config.ENROLL_MIN_TURN_YAW):
+    # Returns why the pose does not fit the requested angle, or None when it does
+    if abs(yaw) > max_yaw:
+        return f"head is turned too far (yaw {yaw:+.2f})"
+    direction = ANGLE_YAW.get(angle)
+    if direction == 0 and abs(yaw) > center_max_yaw:
+        return f"look straight at the camera (yaw {yaw:+.2f})"
+    if direction and yaw * direction < min_turn_yaw:
+        side = 'left' if direction > 0 else 'right'
+        return f"turn your head a little to your {side} (yaw {yaw:+.2f})"
+    return None
+
+
+def score_capture(rgb_image, face_location, angle=None, min_sharpness=config.ENROLL_MIN_SHARPNESS,
+                  min_face_size=config.ENROLL_MIN_FACE_SIZE, max_yaw=config.ENROLL_MAX_YAW):
+    # Returns a dict of scores with 'ok' and the human-readable 'problems' that failed.
+    # angle is the wizard view being captured (a key of ANGLE_YAW); without one, any
+    # pose up to max_yaw is accepted.
+    top, right, bottom, left = face_location
+    face_size = min(bottom - top, right - left)
+    crop = rgb_image[max(top, 0):max(bottom, 0), max(left, 0):max(right, 0)]
+    sharpness = float(cv2.Laplacian(cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY), cv2.CV_64F).var()) if crop.size else 0.0
+    landmarks = fr.face_landmarks(rgb_image, [face_location], model='small')
+    yaw, roll = estimate_pose(landmarks[0]) if landmarks and landmarks[0] else (0.0, 0.0)
+
+    problems = []
+    if sharpness < min_sharpness:
+        problems.append(f"image is blurry (sharpness {sharpness:.0f} < {min_sharpness:.0f})")
+    if face_size < min_face_size:
+        problems.append(f"face is too small ({face_size}px < {min_face_size}px), move closer")
+    pose = pose_problem(yaw, angle, max_yaw)
+    if pose:
+        problems.append(pose)
+    return {
+        'sharpness': sharpness,
+        'face_size': face_size,
+        'yaw': yaw,
+        'roll': roll,
+        'ok': not problems,
+        'problems': problems,
+    }
+
+
+def deduplicate(encodings, min_distance=config.ENROLL_DEDUP_DISTANCE):
+    # Greedy: keeps an encoding only if it is at least min_distance from every kept one
+    kept = []
+    for encoding in encodings:
+        encoding = np.asarray(encoding, dtype=np.float64)
+        if not kept or np.min(np.linalg.norm(np.asarray(kept) - encoding, axis=1)) >= min_distance:
+            kept.append(encoding)
+    return kept
+
+
+def consolidate(encodings, max_centroids, seed=0):
+    # Replaces a member's encodings with at most max_centroids k-means centroids
+    if max_centroids <= 0 or len(encodings) <= max_centroids:
+        return [np.asarray(encoding, dtype=np.float64) for encoding in encodings]
+    centroids, _ = kmeans(np.asarray(encodings), max_centroids, seed=seed)
+    return [centroid.astype(np.float64) for centroid in centroids]
+
+
+def prepare_encodings(encodings, dedup_distance=config.ENROLL_DEDUP_DISTANCE,
+                      max_centroids=config.ENROLL_MAX_CENTROIDS):
+    # The encodings actually stored for a member
+    return consolidate(deduplicate(encodings, dedup_distance), max_centroids)
@@ -0,0 +1,162 @@
+# face_detector.py
+# Interchangeable face detectors. Every backend takes an RGB image and returns
+# boxes as (top, right, bottom, left), the format fr.face_encodings consumes.
+# None of the underlying detectors are safe to share between threads (dlib's
+# detectors hand one thread's boxes to another under concurrent calls, as do
+# OpenCV's CascadeClassifier and dnn.Net), so every backend keeps one instance
+# per thread and a single backend object can be used from any number of threads.
+import logging
+import os
+import threading
+
+import cv2
+import dlib
+import face_recognition_models
+import numpy as np
+
+import config
+
+
+def _clip(box, height, width):
+    top, right, bottom, left = box
+    return max(0, int(top)), min(width, int(right)), min(height, int(bottom)), max(0, int(left))
+
+
+def _rect_box(rect, height, width):
+    return _clip((rect.top(), rect.right(), rect.bottom(), rect.left()), height, width)
+
+
+class HogDetector:
+    # dlib HOG + linear SVM, the app's original detector: same boxes as
+    # fr.face_locations(model='hog'), but with a detector per thread instead of
+    # face_recognition's single module-level one
+
+    def __init__(self, upsample=1):
+        self.upsample = upsample
+        self._local = threading.local()
+
+    def _detector(self):
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = self._local.detector = dlib.get_frontal_face_detector()
+        return detector
+
+    def detect(self, image):
+        height, width = image.shape[:2]
+        return [_rect_box(rect, height, width) for rect in self._detector()(image, self.upsample)]
+
+
+class CnnDetector:
+    # dlib's CNN detector (mmod model from face_recognition_models), one per thread;
+    # most accurate, far too slow for live use without a GPU
+
+    def __init__(self, upsample=1):
+        self.model_file = face_recognition_models.cnn_face_detector_model_location()
+        self.upsample = upsample
+        self._local = threading.local()
+
+    def _detector(self):
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = self._local.detector = dlib.cnn_face_detection_model_v1(self.model_file)
+        return detector
+
+    def detect(self, image):
+        height, width = image.shape[:2]
+        return [_rect_box(detection.rect, height, width) for detection in self._detector()(image, self.upsample)]
+
+
+class HaarDetector:
+    # OpenCV Haar cascade; very fast, frontal faces only, more false positives
+
+    def __init__(self, cascade_file=None, scale_factor=1.1, min_neighbors=5, min_size=40):
+        self.cascade_file = cascade_file or os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+        if not os.path.exists(self.cascade_file):
+            raise FileNotFoundError(f"Haar cascade not found: {self.cascade_file}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self._local = threading.local()
+
+    def _cascade(self):
+        cascade = getattr(self._local, 'cascade', None)
+        if cascade is None:
+            cascade = self._local.cascade = cv2.CascadeClassifier(self.cascade_file)
+        return cascade
+
+    def detect(self, image):
+        gray = cv2.equalizeHist(cv2.cvtColor(image, cv2.COLOR_RGB2GRAY))
+        boxes = self._cascade().detectMultiScale(gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                                                 minSize=(self.min_size, self.min_size))
+        height, width = gray.shape
+        return [_clip((y, x + w, y + h, x), height, width) for x, y, w, h in boxes]
+
+
+class DnnDetector:
+    # OpenCV DNN with the ResNet-10 SSD face model (res10_300x300_ssd_iter_140000.caffemodel
+    # and deploy.prototxt from the OpenCV samples); paths come from FRAS_DNN_MODEL/FRAS_DNN_CONFIG
+
+    def __init__(self, model_file=config.DNN_MODEL, config_file=config.DNN_CONFIG, confidence=0.6, input_size=300):
+        for path in (model_file, config_file):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"DNN face model file not found: {path}")
+        self.model_file = model_file
+        self.config_file = config_file
+        self.confidence = confidence
+        self.input_size = input_size
+        self._local = threading.local()
+
+    def _net(self):
+        net = getattr(self._local, 'net', None)
+        if net is None:
+            net = self._local.net = cv2.dnn.readNet(self.model_file, self.config_file)
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        return net
+
+    def detect(self, image):
+        height, width = image.shape[:2]
+        # The model was trained on BGR with these channel means; swapRB converts our RGB input
+        blob = cv2.dnn.blobFromImage(cv2.resize(image, (self.input_size, self.input_size)), 1.0,
+                                     (self.input_size, self.input_size), (104.0, 177.0, 123.0), swapRB=True)
+        net = self._net()
+        net.setInput(blob)
+        detections = net.forward()[0, 0]
+        boxes = []
+        for detection in detections[detections[:, 2] >= self.confidence]:
+            left, top, right, bottom = detection[3:7] * np.array([width, height, width, height])
+            if right > left and bottom > top:
+                boxes.append(_clip((top, right, bottom, left), height, width))
+        return boxes
+
+
+DETECTORS = {
+    'hog': HogDetector,
+    'cnn': CnnDetector,
+    'haar': HaarDetector,
+    'dnn': DnnDetector,
+}
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def create_detector(name='hog', **kwargs):
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown detector backend '{name}'. Choose from: {', '.join(DETECTORS)}")
+    return DETECTORS[name](**kwargs)
+
+
+def get_detector(detector):
+    # Accepts a detector instance or a backend name; named detectors are created
+    # once per process, which matters for pool workers that only receive the name.
+    # The shared instance is used from every thread in the process (pipeline and
+    # service workers, Streamlit sessions), which is safe only because each backend
+    # keeps its underlying detector per thread; a new backend must do the same.
+    if not isinstance(detector, str):
+        return detector
+    with _shared_lock:
+        if detector not in _shared:
+            _shared[detector] = create_detector(detector)
+            logging.info(f"Face detector '{detector}' loaded.")
+        return _shared[detector]
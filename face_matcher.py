@@ -0,0 +1,389 @@
+# face_matcher.py
+import atexit
+import hashlib
+import os
+import logging
+import threading
+import numpy as np
+
+import config
+
+ENCODING_SIZE = 128
+
+
+def _as_matrix(encodings):
+    return np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+
+
+def _member_digest(encodings):
+    # Content hash of one member's encodings; row order does not count, since the
+    # index regroups a member's rows by list
+    digest = hashlib.sha1()
+    for row in sorted(row.tobytes() for row in _as_matrix(encodings)):
+        digest.update(row)
+    return digest.hexdigest()
+
+
+def _gallery_digest(member_digests):
+    # Content hash of a whole gallery from {name: _member_digest(...)}
+    digest = hashlib.sha1()
+    for name in sorted(member_digests):
+        digest.update(f"{name}\0{member_digests[name]}\0".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _squared_distances(probes, vectors, vector_sq_norms=None):
+    # ||p - v||^2 = ||p||^2 + ||v||^2 - 2 p.v for every probe/vector pair at once
+    if vector_sq_norms is None:
+        vector_sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+    sq_distances = probes @ vectors.T
+    sq_distances *= -2
+    sq_distances += np.einsum('ij,ij->i', probes, probes)[:, None]
+    sq_distances += vector_sq_norms[None, :]
+    np.maximum(sq_distances, 0, out=sq_distances)
+    return sq_distances
+
+
+def kmeans(data, k, iterations=20, seed=0):
+    # Plain Lloyd's k-means; returns (centroids, assignments)
+    data = _as_matrix(data)
+    k = max(1, min(k, len(data)))
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    assignments = np.zeros(len(data), dtype=np.int64)
+    for _ in range(iterations):
+        assignments = np.argmin(_squared_distances(data, centroids), axis=1)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+        non_empty = counts > 0
+        new_centroids = centroids.copy()
+        new_centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+        # Re-seed empty clusters from random points so k stays meaningful
+        empty = np.flatnonzero(~non_empty)
+        if len(empty):
+            new_centroids[empty] = data[rng.choice(len(data), size=len(empty), replace=False)]
+        if np.allclose(new_centroids, centroids):
+            centroids = new_centroids
+            break
+        centroids = new_centroids
+    return centroids, assignments
+
+
+class ExactMatcher:
+    # Brute-force search over one contiguous float32 (N x 128) gallery matrix.
+    # Rows belonging to the same member are adjacent, so gallery_offsets holds the
+    # first row of each member and a per-member minimum is a single reduceat.
+
+    def __init__(self):
+        self.blocks = {}  # name -> (n x 128) float32 encodings
+        self.gallery = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        self.gallery_sq_norms = np.empty(0, dtype=np.float32)
+        self.gallery_owners = np.empty(0, dtype=np.int32)
+        self.gallery_offsets = np.empty(0, dtype=np.intp)
+        self.gallery_names = []
+        self._dirty = False
+
+    def __len__(self):
+        return sum(len(block) for block in self.blocks.values())
+
+    def build(self, members):
+        # members: {name: encodings} for active members only
+        self.blocks = {}
+        for name, encodings in members.items():
+            encodings = _as_matrix(encodings)
+            if len(encodings):
+                self.blocks[name] = encodings
+        self._dirty = True
+
+    def add(self, name, encodings):
+        encodings = _as_matrix(encodings)
+        if len(encodings):
+            self.blocks[name] = encodings
+            self._dirty = True
+
+    def remove(self, name):
+        if self.blocks.pop(name, None) is not None:
+            self._dirty = True
+
+    def _refresh(self):
+        names = list(self.blocks)
+        if names:
+            counts = [len(self.blocks[name]) for name in names]
+            self.gallery = np.ascontiguousarray(np.vstack([self.blocks[name] for name in names]))
+            self.gallery_owners = np.repeat(np.arange(len(names), dtype=np.int32), counts)
+            self.gallery_offsets = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.intp)
+        else:
+            self.gallery = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+            self.gallery_owners = np.empty(0, dtype=np.int32)
+            self.gallery_offsets = np.empty(0, dtype=np.intp)
+        self.gallery_sq_norms = np.einsum('ij,ij->i', self.gallery, self.gallery)
+        self.gallery_names = names
+        self._dirty = False
+        logging.debug(f"Gallery rebuilt: {len(self.gallery)} encodings for {len(names)} active member(s).")
+
+    def search(self, face_encodings, runner_up=False):
+        # Returns one (name, distance) per encoding for the closest member, or (None, inf).
+        # With runner_up, each result also carries the distance to the second-closest
+        # member (inf when there is none).
+        if self._dirty:
+            self._refresh()
+        if len(face_encodings) == 0:
+            return []
+        if len(self.gallery_names) == 0:
+            return [(None, float('inf')) + ((float('inf'),) if runner_up else ())] * len(face_encodings)
+
+        probes = _as_matrix(face_encodings)
+        sq_distances = _squared_distances(probes, self.gallery, self.gallery_sq_norms)
+        member_distances = np.sqrt(np.minimum.reduceat(sq_distances, self.gallery_offsets, axis=1))
+        best_members = np.argmin(member_distances, axis=1)
+        best_distances = member_distances[np.arange(len(probes)), best_members]
+        if not runner_up:
+            return [(self.gallery_names[member], float(distance)) for member, distance in zip(best_members, best_distances)]
+        if len(self.gallery_names) > 1:
+            second_distances = np.partition(member_distances, 1, axis=1)[:, 1]
+        else:
+            second_distances = np.full(len(probes), np.inf)
+        return [(self.gallery_names[member], float(distance), float(second))
+                for member, distance, second in zip(best_members, best_distances, second_distances)]
+
+    def save(self, path):
+        pass  # Rebuilt from the member store on load, nothing to persist
+
+    def flush(self):
+        pass
+
+    def load(self, path, members):
+        self.build(members)
+        return False
+
+
+class IVFMatcher:
+    # Inverted-file index: a k-means coarse quantizer splits the gallery into n_lists
+    # cells and a query only scans the n_probe cells nearest to it. n_probe is the
+    # recall-vs-latency knob; n_probe == n_lists is exact search.
+    #
+    # save() is debounced: the first change schedules one write save_delay seconds
+    # later that covers every change made in between, so enrolling or deleting many
+    # members does not rewrite the whole index each time. flush() writes a pending
+    # save immediately and runs at exit.
+
+    def __init__(self, n_lists=None, n_probe=config.IVF_N_PROBE, min_train_size=1024, retrain_growth=4.0, seed=0,
+                 save_delay=config.IVF_SAVE_DELAY):
+        self.n_lists = n_lists  # None picks ~sqrt(N) at training time
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self.seed = seed
+        self.save_delay = save_delay
+        self._lock = threading.RLock()  # Keeps a background save from seeing a half-applied change
+        self._save_path = None
+        self._save_timer = None
+        atexit.register(self.flush)
+        self.centroids = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        self.list_vectors = []
+        self.list_owners = []
+        self.names = []  # owner id -> name (None once deleted)
+        self.name_ids = {}
+        self.name_lists = {}  # name -> set of list ids holding its encodings
+        self.digests = {}  # name -> _member_digest of its encodings, saved with the index
+        self.trained_size = 0
+
+    def __len__(self):
+        return sum(len(owners) for owners in self.list_owners)
+
+    def _reset(self):
+        self.centroids = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        self.list_vectors = []
+        self.list_owners = []
+        self.names = []
+        self.name_ids = {}
+        self.name_lists = {}
+        self.digests = {}
+        self.trained_size = 0
+
+    def build(self, members):
+        blocks = {name: _as_matrix(encodings) for name, encodings in members.items()}
+        blocks = {name: block for name, block in blocks.items() if len(block)}
+        vectors = np.vstack(list(blocks.values())) if blocks else np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        with self._lock:
+            self._reset()
+            self._train(vectors)
+            for name, block in blocks.items():
+                self._insert(name, block)
+        logging.info(f"IVF index built: {len(vectors)} encodings in {len(self.centroids)} list(s), n_probe={self.n_probe}.")
+
+    def _train(self, vectors):
+        if len(vectors) < self.min_train_size:
+            # Too small to be worth partitioning: a single list is exact search
+            self.centroids = np.zeros((1, ENCODING_SIZE), dtype=np.float32)
+        else:
+            n_lists = self.n_lists or int(np.sqrt(len(vectors)))
+            # Training on a sample keeps k-means cost bounded for very large galleries
+            sample_size = min(len(vectors), n_lists * 64)
+            rng = np.random.default_rng(self.seed)
+            sample = vectors[rng.choice(len(vectors), size=sample_size, replace=False)]
+            self.centroids, _ = kmeans(sample, n_lists, seed=self.seed)
+        self.list_vectors = [np.empty((0, ENCODING_SIZE), dtype=np.float32) for _ in self.centroids]
+        self.list_owners = [np.empty(0, dtype=np.int32) for _ in self.centroids]
+        self.trained_size = len(vectors)
+
+    def _insert(self, name, encodings):
+        owner = len(self.names)
+        self.names.append(name)
+        self.name_ids[name] = owner
+        self.digests[name] = _member_digest(encodings)
+        assignments = np.argmin(_squared_distances(encodings, self.centroids), axis=1)
+        lists = set()
+        for list_id in np.unique(assignments):
+            rows = encodings[assignments == list_id]
+            self.list_vectors[list_id] = np.vstack((self.list_vectors[list_id], rows))
+            self.list_owners[list_id] = np.concatenate((self.list_owners[list_id], np.full(len(rows), owner, dtype=np.int32)))
+            lists.add(int(list_id))
+        self.name_lists[name] = lists
+
+    def _members(self):
+        members = {}
+        for name, owner in self.name_ids.items():
+            members[name] = np.vstack([
+                self.list_vectors[list_id][self.list_owners[list_id] == owner] for list_id in self.name_lists[name]
+            ])
+        return members
+
+    def add(self, name, encodings):
+        encodings = _as_matrix(encodings)
+        with self._lock:
+            if name in self.name_ids:
+                self.remove(name)
+            if not len(encodings):
+                return
+            self._insert(name, encodings)
+            # Cells drift out of balance as the roster grows; retrain once it has grown enough
+            size = len(self)
+            if (self.trained_size < self.min_train_size <= size) or size > self.trained_size * self.retrain_growth:
+                self.build(self._members())
+
+    def remove(self, name):
+        with self._lock:
+            owner = self.name_ids.pop(name, None)
+            if owner is None:
+                return
+            self.names[owner] = None
+            del self.digests[name]
+            for list_id in self.name_lists.pop(name):
+                keep = self.list_owners[list_id] != owner
+                self.list_vectors[list_id] = self.list_vectors[list_id][keep]
+                self.list_owners[list_id] = self.list_owners[list_id][keep]
+
+    def search(self, face_encodings, runner_up=False):
+        # As ExactMatcher.search; the runner-up is the closest other member within
+        # the probed lists
+        if len(face_encodings) == 0:
+            return []
+        empty = (None, float('inf')) + ((float('inf'),) if runner_up else ())
+        if not self.name_ids:
+            return [empty] * len(face_encodings)
+
+        probes = _as_matrix(face_encodings)
+        n_probe = max(1, min(self.n_probe, len(self.centroids)))
+        centroid_distances = _squared_distances(probes, self.centroids)
+        nearest_lists = np.argpartition(centroid_distances, n_probe - 1, axis=1)[:, :n_probe]
+
+        results = []
+        for probe, lists in zip(probes, nearest_lists):
+            candidates = [list_id for list_id in lists if len(self.list_owners[list_id])]
+            if not candidates:
+                results.append(empty)
+                continue
+            vectors = np.vstack([self.list_vectors[list_id] for list_id in candidates])
+            owners = np.concatenate([self.list_owners[list_id] for list_id in candidates])
+            sq_distances = _squared_distances(probe[None, :], vectors)[0]
+            best = int(np.argmin(sq_distances))
+            result = (self.names[owners[best]], float(np.sqrt(sq_distances[best])))
+            if runner_up:
+                others = sq_distances[owners != owners[best]]
+                result += (float(np.sqrt(others.min())) if len(others) else float('inf'),)
+            results.append(result)
+        return results
+
+    def save(self, path):
+        if self.save_delay <= 0:
+            self._write(path)
+            return
+        with self._lock:
+            self._save_path = path
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self):
+        with self._lock:
+            path, self._save_path = self._save_path, None
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+        if path is not None:
+            self._write(path)
+
+    def _write(self, path):
+        with self._lock:
+            arrays = dict(
+                centroids=self.centroids,
+                vectors=np.vstack(self.list_vectors) if self.list_vectors else np.empty((0, ENCODING_SIZE), dtype=np.float32),
+                owners=np.concatenate(self.list_owners) if self.list_owners else np.empty(0, dtype=np.int32),
+                list_sizes=np.array([len(owners) for owners in self.list_owners], dtype=np.int64),
+                names=np.array(['' if name is None else name for name in self.names], dtype=str),
+                trained_size=np.array(self.trained_size),
+                digest=np.array(_gallery_digest(self.digests)),
+            )
+        # Written aside and renamed, so another process never loads a half-written index
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+        logging.debug(f"IVF index saved to {path}.")
+
+    def load(self, path, members):
+        # Reuses the persisted index when the content digest saved with it matches the
+        # given members (counts alone miss a member re-enrolled with as many encodings
+        # as before), otherwise rebuilds it. Returns True when the saved index was reused.
+        if os.path.exists(path):
+            digests = {name: _member_digest(enc) for name, enc in members.items() if len(_as_matrix(enc))}
+            try:
+                with np.load(path) as data:
+                    fresh = 'digest' in data.files and str(data['digest']) == _gallery_digest(digests)
+                    if fresh:
+                        self._reset()
+                        self.centroids = data['centroids']
+                        boundaries = np.cumsum(data['list_sizes'])[:-1]
+                        self.list_vectors = np.split(data['vectors'], boundaries)
+                        self.list_owners = [owners.astype(np.int32) for owners in np.split(data['owners'], boundaries)]
+                        self.names = [name or None for name in data['names'].tolist()]
+                        self.trained_size = int(data['trained_size'])
+                if fresh:
+                    for list_id, owners in enumerate(self.list_owners):
+                        for owner in np.unique(owners):
+                            name = self.names[owner]
+                            self.name_ids[name] = int(owner)
+                            self.name_lists.setdefault(name, set()).add(list_id)
+                    self.digests = digests
+                    logging.info(f"IVF index loaded from {path} ({len(self)} encodings).")
+                    return True
+                logging.warning(f"IVF index at {path} is out of date with the member store. Rebuilding.")
+            except (OSError, KeyError, ValueError) as e:
+                logging.error(f"Failed to load IVF index from {path}: {e}")
+        self.build(members)
+        self.save(path)
+        return False
+
+MATCHERS = {
+    'exact': ExactMatcher,
+    'ivf': IVFMatcher,
+}
+
+
+def create_matcher(name='exact', **kwargs):
+    if name not in MATCHERS:
+        raise ValueError(f"Unknown matcher backend '{name}'. Choose from: {', '.join(MATCHERS)}")
+    return MATCHERS[name](**kwargs)
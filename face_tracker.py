@@ -0,0 +1,144 @@
+# face_tracker.py
+import itertools
+import logging
+import threading
+import time
+
+
+def box_iou(a, b):
+    # Boxes are (top, right, bottom, left) as returned by face_recognition
+    top, right, bottom, left = max(a[0], b[0]), min(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    union = (a[1] - a[3]) * (a[2] - a[0]) + (b[1] - b[3]) * (b[2] - b[0]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class Track:
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = box
+        self.name = None  # None until the first encoding has been matched
+        self.encoded_box = None
+        self.encoded_at = 0.0
+        self.missed = 0
+
+
+class TrackPlan:
+    # Result of associating one frame's detections with the current tracks
+    def __init__(self, face_locations, tracks, needs_encoding):
+        self.face_locations = face_locations
+        self.tracks = tracks  # Track per location, or None when the frame was not tracked
+        self.needs_encoding = needs_encoding
+
+    def locations_to_encode(self):
+        return [loc for loc, needed in zip(self.face_locations, self.needs_encoding) if needed]
+
+
+class FaceTracker:
+    # Associates detected boxes across frames by IoU and carries each track's identity
+    # forward, so the 128-d encoding only runs for new tracks, tracks whose box has
+    # drifted from where it was last encoded, and identities older than their TTL.
+
+    def __init__(self, recognizer, iou_threshold=0.3, drift_iou=0.5, identity_ttl=2.0, unknown_ttl=0.5, max_missed=5):
+        self.recognizer = recognizer
+        self.iou_threshold = iou_threshold
+        self.drift_iou = drift_iou
+        self.identity_ttl = identity_ttl
+        self.unknown_ttl = unknown_ttl
+        self.max_missed = max_missed
+        self.tracks = []
+        self.last_frame_id = 0
+        self.encodings_run = 0
+        self.encodings_skipped = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _needs_encoding(self, track, box, now):
+        if track.name is None or track.encoded_box is None:
+            return True
+        if box_iou(box, track.encoded_box) < self.drift_iou:
+            return True
+        ttl = self.unknown_ttl if track.name == "Unknown" else self.identity_ttl
+        return now - track.encoded_at > ttl
+
+    def associate(self, face_locations, frame_id=None):
+        now = time.monotonic()
+        with self._lock:
+            if frame_id is not None and frame_id <= self.last_frame_id:
+                # A worker finished out of order; process it untracked rather than rewind tracks
+                return TrackPlan(face_locations, [None] * len(face_locations), [True] * len(face_locations))
+            if frame_id is not None:
+                self.last_frame_id = frame_id
+
+            # Greedy matching, highest IoU first
+            pairs = sorted(
+                ((box_iou(track.box, box), t, b) for t, track in enumerate(self.tracks) for b, box in enumerate(face_locations)),
+                reverse=True
+            )
+            assigned_tracks, assigned = set(), {}
+            for overlap, t, b in pairs:
+                if overlap < self.iou_threshold:
+                    break
+                if t in assigned_tracks or b in assigned:
+                    continue
+                assigned_tracks.add(t)
+                assigned[b] = self.tracks[t]
+
+            for t, track in enumerate(self.tracks):
+                if t not in assigned_tracks:
+                    track.missed += 1
+            self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+            tracks, needs_encoding = [], []
+            for b, box in enumerate(face_locations):
+                track = assigned.get(b)
+                if track is None:
+                    track = Track(next(self._ids), box)
+                    self.tracks.append(track)
+                track.box = box
+                track.missed = 0
+                tracks.append(track)
+                needs_encoding.append(self._needs_encoding(track, box, now))
+
+            skipped = needs_encoding.count(False)
+            self.encodings_run += len(needs_encoding) - skipped
+            self.encodings_skipped += skipped
+        return TrackPlan(face_locations, tracks, needs_encoding)
+
+    def resolve(self, plan, face_encodings):
+        # face_encodings correspond to plan.locations_to_encode()
+        to_encode = plan.locations_to_encode()
+        identified = iter(self.recognizer.identify_faces(to_encode, face_encodings) if to_encode else [])
+        now = time.monotonic()
+        recognized_faces = []
+        with self._lock:
+            for location, track, needed in zip(plan.face_locations, plan.tracks, plan.needs_encoding):
+                if needed:
+                    name = next(identified)['name']
+                    if track is not None:
+                        track.name = name
+                        track.encoded_box = location
+                        track.encoded_at = now
+                else:
+                    name = track.name
+                recognized_faces.append({
+                    'location': location,
+                    'name': name,
+                    'track_id': track.track_id if track is not None else None
+                })
+        return recognized_faces
+
+    def recognize_faces(self, image):
+        plan = self.associate(self.recognizer.detect_faces(image))
+        face_encodings = self.recognizer.encode_faces(image, plan.locations_to_encode())
+        return self.resolve(plan, face_encodings)
+
+    def skip_rate(self):
+        total = self.encodings_run + self.encodings_skipped
+        return self.encodings_skipped / total if total else 0.0
+
+    def reset(self):
+        with self._lock:
+            self.tracks = []
+            self.last_frame_id = 0
+        logging.info(f"Face tracker reset; {self.skip_rate():.0%} of encodings skipped so far.")
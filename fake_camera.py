@@ -0,0 +1,88 @@
+# fake_camera.py
+import os
+import time
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class FakeCamera:
+    # Drop-in stand-in for cv2.VideoCapture that serves frames from a directory of
+    # images, a video file or an in-memory list of frames, looping forever by
+    # default. Used to run the live pipeline and benchmarks without a webcam.
+
+    def __init__(self, source, fps=None, loop=True, size=(640, 480)):
+        self.fps = fps
+        self.loop = loop
+        self.frames = self._load(source, size)
+        self.index = 0
+        self.opened = bool(self.frames)
+        self._last_read = None
+
+    @staticmethod
+    def _load(source, size):
+        if isinstance(source, (list, tuple)):
+            return list(source)
+        if source is None:
+            # Plain noise frames: exercises the pipeline with no faces present
+            rng = np.random.default_rng(0)
+            return [rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8) for _ in range(8)]
+        if os.path.isdir(source):
+            frames = []
+            for filename in sorted(os.listdir(source)):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    frame = cv2.imread(os.path.join(source, filename))
+                    if frame is not None:
+                        frames.append(frame)
+            return frames
+        capture = cv2.VideoCapture(source)
+        frames = []
+        while True:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            frames.append(frame)
+        capture.release()
+        return frames
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps or 0)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.frames))
+        return 0.0
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        if self.index >= len(self.frames):
+            if not self.loop:
+                self.opened = False
+                return False, None
+            self.index = 0
+        if self.fps:
+            # Pace reads like a real camera would
+            now = time.perf_counter()
+            if self._last_read is not None:
+                wait = 1.0 / self.fps - (now - self._last_read)
+                if wait > 0:
+                    time.sleep(wait)
+            self._last_read = time.perf_counter()
+        frame = self.frames[self.index].copy()
+        self.index += 1
+        return True, frame
+
+    def grab(self):
+        ret, _ = self.read()
+        return ret
+
+    def release(self):
+        self.opened = False
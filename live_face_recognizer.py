@@ -1,11 +1,18 @@
 # live_face_recognizer.py
 import face_recognition as fr
-import pickle
+import cv2
 import os
-import numpy as np
-import csv
 from datetime import datetime
 import logging
+import threading
+from face_detector import get_detector
+from face_matcher import create_matcher
+from recognition_cache import RecognitionCache
+from attendance_writer import AttendanceWriter
+from member_store import create_member_store
+from attendance_store import create_attendance_store, export_csv
+from attendance_report import AttendanceReport
+import metrics
 
 # Configure logging
 logging.basicConfig(
@@ -15,14 +22,66 @@ logging.basicConfig(
     level=logging.INFO
 )
 
+def scaled_face_locations(image, scale=1.0, detector='hog'):
+    # Detect on a downsampled copy and map the boxes back to full-resolution coordinates
+    detector = get_detector(detector)
+    if scale >= 1.0:
+        return detector.detect(image)
+    small = cv2.resize(image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    height, width = image.shape[:2]
+    return [
+        (
+            max(0, int(round(top / scale))),
+            min(width, int(round(right / scale))),
+            min(height, int(round(bottom / scale))),
+            max(0, int(round(left / scale))),
+        )
+        for top, right, bottom, left in detector.detect(small)
+    ]
+
+
 class LiveFaceRecognizer:
-    def __init__(self, data_file='face_data.pkl', attendance_file='attendance.csv', admin_password='admin123'):
+    def __init__(self, data_file='face_data.pkl', attendance_file='attendance.csv', admin_password='admin123',
+                 matcher='exact', matcher_options=None, detection_scale=1.0, storage='pickle',
+                 attendance_backend='csv', detector='hog', cache_size=0, warm_report=False):
         self.members = {}  # Dictionary to store name: [encodings, status]
+        self.store_version = None  # Store version the in-memory members were loaded from
+        # Search index over active members' encodings; a name or a matcher instance
+        self.matcher = create_matcher(matcher, **(matcher_options or {})) if isinstance(matcher, str) else matcher
         self.data_file = data_file
+        # 'pickle' rewrites face_data.pkl on every change; 'mmap' appends to a memory-mapped store
+        self.store = create_member_store(storage, data_file)
+        self.index_file = os.path.splitext(data_file)[0] + '.index.npz'
         self.attendance_file = attendance_file
+        # 'csv' appends to attendance.csv; 'sqlite' keeps an indexed table in attendance.db
+        self.attendance_store = create_attendance_store(attendance_backend, attendance_file)
         self.admin_password = admin_password
+        # Detection runs on the frame resized by this factor; encodings still use the full frame
+        self.detection_scale = detection_scale
+        # Face detector backend; a name from face_detector.DETECTORS or a detector instance
+        self.detector = get_detector(detector)
+        # Reuses results for encodings close to recent ones; cleared whenever the roster changes
+        self.recognition_cache = RecognitionCache(cache_size) if cache_size else None
+        # Roll numbers already marked on attendance_date, so repeat sightings skip file I/O
+        self.attendance_date = None
+        self.marked_today = set()
+        self.backfill_marked = {}  # date -> roll numbers, for attendance marked with an explicit timestamp
+        # Guards members, the matcher and the attendance index when frames are
+        # processed on worker threads
+        self.lock = threading.RLock()
         self.load_data()
+        self.matcher.load(self.index_file, self._active_encodings())
         self.initialize_attendance_file()
+        self.load_attendance_index()
+        # Aggregates are built lazily on first use and then kept up to date incrementally.
+        # With warm_report the first build runs on a background thread at startup, and
+        # once it is done the writer thread folds in each batch as it is written, so
+        # report pages never pay for a cold build.
+        self.attendance_report = AttendanceReport(self.attendance_store)
+        self.report_warm = threading.Event()
+        self.attendance_writer = AttendanceWriter(self.attendance_store, on_flush=self._refresh_warm_report)
+        if warm_report:
+            threading.Thread(target=self._warm_report, name='attendance-report', daemon=True).start()
         logging.info("LiveFaceRecognizer initialized.")
 
     def authenticate_admin(self, password):
@@ -33,20 +92,53 @@ class LiveFaceRecognizer:
             logging.warning(f"Attempted to add existing member: {name}")
             return False  # Name already exists
         else:
-            # Store name, roll number, and encodings in a dictionary
-            self.members[name] = {
-                'roll_no': roll_no,
-                'encodings': face_encodings,
-                'active': True
-            }
-            self.save_data()
+            with self.lock:
+                # Store name, roll number, and encodings in a dictionary
+                self.members[name] = {
+                    'roll_no': roll_no,
+                    'encodings': face_encodings,
+                    'active': True
+                }
+                self.matcher.add(name, face_encodings)
+                self._invalidate_cache()
+            self.store.add_member(self.members, name)
+            self.store_version = self.store.version()
+            self.matcher.save(self.index_file)
             logging.info(f"Added new member: {name} (Roll No: {roll_no}) with {len(face_encodings)} encodings.")
             return True
 
+    def add_members(self, new_members):
+        # Bulk enrollment: new_members is {name: (roll_no, encodings)}; everything is
+        # committed to the store in one write. Returns the names that were added.
+        added = []
+        with self.lock:
+            for name, (roll_no, face_encodings) in new_members.items():
+                if name in self.members:
+                    logging.warning(f"Attempted to add existing member: {name}")
+                    continue
+                self.members[name] = {
+                    'roll_no': roll_no,
+                    'encodings': face_encodings,
+                    'active': True
+                }
+                self.matcher.add(name, face_encodings)
+                added.append(name)
+            self._invalidate_cache()
+        self.store.add_members(self.members, added)
+        self.store_version = self.store.version()
+        self.matcher.save(self.index_file)
+        logging.info(f"Added {len(added)} new member(s) in bulk.")
+        return added
+
     def delete_member(self, name):
         if name in self.members:
-            del self.members[name]
-            self.save_data()
+            with self.lock:
+                del self.members[name]
+                self.matcher.remove(name)
+                self._invalidate_cache()
+            self.store.delete_member(self.members, name)
+            self.store_version = self.store.version()
+            self.matcher.save(self.index_file)
             print("GO")
             logging.info(f"Deleted member: {name}")
             return True
@@ -54,105 +146,202 @@ class LiveFaceRecognizer:
             logging.warning(f"Attempted to delete non-existing member: {name}")
             return False  # Member not found
 
-    def recognize_faces(self, image):
-        recognized_faces = []
-        face_locations = fr.face_locations(image, model='hog')
-        face_encodings = fr.face_encodings(image, face_locations)
+    def set_member_active(self, name, active):
+        if name not in self.members:
+            logging.warning(f"Attempted to change status of non-existing member: {name}")
+            return False
+        with self.lock:
+            self.members[name]['active'] = bool(active)
+            if active:
+                self.matcher.add(name, self.members[name]['encodings'])
+            else:
+                self.matcher.remove(name)
+            self._invalidate_cache()
+        self.store.update_member(self.members, name)
+        self.store_version = self.store.version()
+        self.matcher.save(self.index_file)
+        logging.info(f"Member {name} marked {'active' if active else 'inactive'}.")
+        return True
 
-        for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-            name = "Unknown"
-            best_match_distance = float('inf')
+    def _active_encodings(self):
+        return {name: data['encodings'] for name, data in self.members.items() if data['active']}
 
-            for member_name, member_data in self.members.items():
-                if not member_data['active']:  # Skip inactive members
-                    continue
-                matches = fr.compare_faces(member_data['encodings'], face_encoding, tolerance=0.6)
-                face_distances = fr.face_distance(member_data['encodings'], face_encoding)
+    def rebuild_gallery(self):
+        with self.lock:
+            self.matcher.build(self._active_encodings())
+            self._invalidate_cache()
+        self.matcher.save(self.index_file)
 
-                if len(face_distances) == 0:
-                    continue
-                min_distance = min(face_distances)
-                if min_distance < best_match_distance and matches[np.argmin(face_distances)]:
-                    best_match_distance = min_distance
-                    name = member_name
+    def _invalidate_cache(self):
+        if self.recognition_cache is not None:
+            self.recognition_cache.clear()
+
+    def match_encodings(self, face_encodings, tolerance=0.6):
+        # Returns one (name, distance) per encoding; name is "Unknown" when the closest
+        # member is farther than the tolerance.
+        with metrics.timed('fras_match', "Gallery matching time per frame"):
+            if self.recognition_cache is None:
+                results = self.matcher.search(face_encodings)
+            else:
+                # Only encodings the cache cannot answer go to the gallery
+                results = [self.recognition_cache.lookup(encoding, tolerance) for encoding in face_encodings]
+                misses = [i for i, result in enumerate(results) if result is None]
+                if misses:
+                    searched = self.matcher.search([face_encodings[i] for i in misses], runner_up=True)
+                    for i, (name, distance, runner_up) in zip(misses, searched):
+                        self.recognition_cache.insert(face_encodings[i], name, distance, runner_up, tolerance)
+                        results[i] = (name, distance)
+            return [
+                (name, distance) if name is not None and distance <= tolerance else ("Unknown", distance)
+                for name, distance in results
+            ]
 
-            if name != "Unknown":
-                self.mark_attendance(name)
+    def detect_faces(self, image):
+        with metrics.timed('fras_detect', "Face detection time per frame"):
+            face_locations = scaled_face_locations(image, self.detection_scale, self.detector)
+        metrics.counter('fras_faces_detected', "Faces detected").inc(len(face_locations))
+        return face_locations
 
-            recognized_faces.append({
-                'location': (top, right, bottom, left),
-                'name': name
-            })
+    def encode_faces(self, image, face_locations):
+        with metrics.timed('fras_encode', "Face encoding time per frame"):
+            return fr.face_encodings(image, face_locations)
+
+    def identify_faces(self, face_locations, face_encodings, when=None):
+        # Match encodings against the gallery and mark attendance for known members.
+        # `when` overrides the attendance timestamp, e.g. when processing recorded video.
+        recognized_faces = []
+        with self.lock:
+            matches = self.match_encodings(face_encodings, tolerance=0.6)
+
+            for (top, right, bottom, left), (name, _) in zip(face_locations, matches):
+                if name != "Unknown":
+                    with metrics.timed('fras_attendance', "Attendance check and enqueue time per recognized face"):
+                        self.mark_attendance(name, when)
+
+                recognized_faces.append({
+                    'location': (top, right, bottom, left),
+                    'name': name
+                })
 
         logging.info(f"Recognized faces: {[face['name'] for face in recognized_faces]}")
         return recognized_faces
 
-    def mark_attendance(self, name):
-        now = datetime.now()
+    def recognize_faces(self, image):
+        face_locations = self.detect_faces(image)
+        face_encodings = self.encode_faces(image, face_locations)
+        return self.identify_faces(face_locations, face_encodings)
+
+    def load_attendance_index(self, date_string=None):
+        # Read the attendance store once for rows of the given day (default today)
+        date_string = date_string or datetime.now().strftime("%Y-%m-%d")
+        self.attendance_date = date_string
+        self.marked_today = self.attendance_store.marked_on(date_string)
+        logging.info(f"Attendance index loaded: {len(self.marked_today)} member(s) already marked on {date_string}.")
+
+    def mark_attendance(self, name, when=None):
+        now = when or datetime.now()
         date_string = now.strftime("%Y-%m-%d")
         time_string = now.strftime("%H:%M:%S")
 
-        already_present = False
-        if os.path.exists(self.attendance_file):
-            with open(self.attendance_file, 'r', newline='') as f:
-                reader = csv.DictReader(f)
-                roll_no = self.members[name]['roll_no'] if name in self.members else None
-                for row in reader:
-                    if row['Roll No'] == self.members[name]['roll_no'] and row['Date'] == date_string:
-                        already_present = True
-                        break
-
-        if not already_present:
-            roll_no = self.members[name]['roll_no']  # Retrieve roll number
-            with open(self.attendance_file, 'a', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([roll_no, name, date_string, time_string])
-            logging.info(f"Attendance marked for {name} (Roll No: {roll_no}) at {time_string} on {date_string}.")
-        
-    def initialize_attendance_file(self):
-        if not os.path.exists(self.attendance_file):
-            with open(self.attendance_file, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Roll No', 'Name', 'Date', 'Time'])  # Added Roll No
-            logging.info(f"Attendance file '{self.attendance_file}' created.")
+        if when is None or date_string == datetime.now().strftime("%Y-%m-%d"):
+            if date_string != self.attendance_date:
+                # Midnight rollover: nobody has been marked on the new day yet
+                self.attendance_date = date_string
+                self.marked_today = set()
+            marked = self.marked_today
         else:
-            logging.info(f"Attendance file '{self.attendance_file}' found.")
+            # Back-filling another day: dedup against that day's stored rows instead
+            if date_string not in self.backfill_marked:
+                self._flush_attendance()
+                self.backfill_marked[date_string] = self.attendance_store.marked_on(date_string)
+            marked = self.backfill_marked[date_string]
+
+        roll_no = self.members[name]['roll_no']  # Retrieve roll number
+        if roll_no in marked:
+            return
+
+        # Queued for the background writer; never blocks recognize_faces
+        self.attendance_writer.write([roll_no, name, date_string, time_string])
+        marked.add(roll_no)
+        metrics.counter('fras_attendance_marked', "Attendance rows marked").inc()
+        logging.info(f"Attendance marked for {name} (Roll No: {roll_no}) at {time_string} on {date_string}.")
+
+    def initialize_attendance_file(self):
+        self.attendance_store.initialize()
 
     def save_data(self):
         logging.debug("Saving data...")
-        with open(self.data_file, 'wb') as f:
-            pickle.dump({'members': self.members}, f)
+        self.store.save_all(self.members)
+        self.store_version = self.store.version()
+        self.matcher.save(self.index_file)
         logging.info("Face data saved successfully.")
 
     def load_data(self):
-        if os.path.exists(self.data_file):
-            if os.path.getsize(self.data_file) == 0:
-                logging.warning("The data file is empty. Starting fresh.")
-                self.members = {}
-                return
-            
-            try:
-                with open(self.data_file, 'rb') as f:
-                    data = pickle.load(f)
-                    if not data or 'members' not in data:
-                        raise ValueError("Invalid data format in pickle file.")
-                    self.members = data['members']
-                    logging.info(f"Loaded {len(self.members)} member(s) from storage.")
-            except (pickle.UnpicklingError, ValueError) as e:
-                logging.error(f"Failed to load data due to corruption or invalid format: {e}")
-                self.members = {}
-        else:
-            logging.info("No existing face data found. Starting fresh.")
-            
+        self.members = self.store.load()
+        self.store_version = self.store.version()
+
+    def reload_members(self):
+        # Picks up member changes written to the store by another process
+        members = self.store.load()
+        with self.lock:
+            self.members = members
+            self.matcher.build(self._active_encodings())
+            self._invalidate_cache()
+        self.store_version = self.store.version()
+        logging.info(f"Reloaded {len(members)} member(s) from storage.")
+
+    def reload_if_changed(self):
+        # Cheap check (a stat or a PRAGMA) meant to run on every UI interaction
+        if self.store.version() != self.store_version:
+            self.reload_members()
+            return True
+        return False
+
     def get_all_members(self):
         return {name: data['active'] for name, data in self.members.items()}
 
-    def get_attendance_records(self):
-        if not os.path.exists(self.attendance_file):
-            return []
-        with open(self.attendance_file, 'r', newline='') as f:
-            reader = csv.DictReader(f)
-            return list(reader)
-    
+    def _flush_attendance(self):
+        # Queries read the store, so rows the writer failed to write are missing from them
+        if not self.attendance_writer.flush():
+            logging.warning("Queued attendance rows could not be written; results may miss recent marks.")
+
+    def get_attendance_records(self, start_date=None, end_date=None, roll_no=None, limit=None, offset=0):
+        # Flush first so the records include rows still queued for the writer
+        self._flush_attendance()
+        return self.attendance_store.query(start_date, end_date, roll_no, limit=limit, offset=offset)
+
+    def count_attendance_records(self, start_date=None, end_date=None, roll_no=None):
+        self._flush_attendance()
+        return self.attendance_store.count(start_date, end_date, roll_no)
+
+    def export_attendance_csv(self, start_date=None, end_date=None, roll_no=None):
+        self._flush_attendance()
+        return export_csv(self.attendance_store.iter_records(start_date, end_date, roll_no))
+
+    def _warm_report(self):
+        with metrics.timed('fras_report_warm', "Attendance report build time at startup"):
+            rows = self.attendance_report.refresh()
+        self.report_warm.set()
+        logging.info(f"Attendance report built from {rows} row(s).")
+
+    def _refresh_warm_report(self):
+        # Runs on the writer thread; before the first build finishes it would only wait on it
+        if self.report_warm.is_set():
+            self.attendance_report.refresh()
+
+    def get_attendance_report(self):
+        # Folds in rows written since the last call, including rows still queued for the writer;
+        # on a warm report this is cheap, as the writer has already folded in flushed batches
+        self._flush_attendance()
+        with metrics.timed('fras_report_refresh', "Attendance report refresh time"):
+            self.attendance_report.refresh()
+        return self.attendance_report
+
     def get_data(self):
-        return self.members
\ No newline at end of file
+        return self.members
+
+    def close(self):
+        self.matcher.flush()
+        self.attendance_writer.close()
+        self.attendance_store.close()
+        self.store.close()
\ No newline at end of file
@@ -0,0 +1,338 @@
+# member_store.py
+import argparse
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+ENCODING_SIZE = 128
+ROW_BYTES = ENCODING_SIZE * np.dtype(np.float32).itemsize
+
+
+class PickleMemberStore:
+    # Original format: every change rewrites all members and encodings to one pickle
+
+    def __init__(self, data_file):
+        self.data_file = data_file
+
+    def load(self):
+        if os.path.exists(self.data_file):
+            if os.path.getsize(self.data_file) == 0:
+                logging.warning("The data file is empty. Starting fresh.")
+                return {}
+
+            try:
+                with open(self.data_file, 'rb') as f:
+                    data = pickle.load(f)
+                    if not data or 'members' not in data:
+                        raise ValueError("Invalid data format in pickle file.")
+                    members = data['members']
+                    logging.info(f"Loaded {len(members)} member(s) from storage.")
+                    return members
+            except (pickle.UnpicklingError, ValueError) as e:
+                logging.error(f"Failed to load data due to corruption or invalid format: {e}")
+                return {}
+        else:
+            logging.info("No existing face data found. Starting fresh.")
+            return {}
+
+    def save_all(self, members):
+        with open(self.data_file, 'wb') as f:
+            pickle.dump({'members': members}, f)
+
+    def version(self):
+        # Changes whenever the pickle is rewritten, by this or any other process
+        if not os.path.exists(self.data_file):
+            return None
+        stat = os.stat(self.data_file)
+        return stat.st_mtime_ns, stat.st_size
+
+    # The pickle holds everything, so each change is a full rewrite
+    def add_member(self, members, name):
+        self.save_all(members)
+
+    def add_members(self, members, names):
+        self.save_all(members)
+
+    def delete_member(self, members, name):
+        self.save_all(members)
+
+    def update_member(self, members, name):
+        self.save_all(members)
+
+    def close(self):
+        pass
+
+
+class MmapMemberStore:
+    # Encodings are appended as raw float32 rows to <base>.<generation>.f32 and
+    # memory-mapped on load; metadata (roll_no, active, row offsets) lives in
+    # <base>.sqlite. Adding a member appends its rows and inserts one index row,
+    # deleting only drops the index row and leaves its encodings as dead rows
+    # until compact() rewrites the file without them.
+    #
+    # Several processes (the app, the recognition service, maintenance tools) may
+    # open the same store, and any of them can move it to a new generation file.
+    # Every operation therefore re-reads meta.encodings_file inside a transaction:
+    # readers map the file while holding a shared lock, and writers append and
+    # switch generations under SQLite's write lock, so the index and the file it
+    # points at always agree.
+
+    def __init__(self, base_path, compact_ratio=0.5, compact_min_rows=1024):
+        self.base_path = base_path
+        self.index_file = base_path + '.sqlite'
+        self.compact_ratio = compact_ratio
+        self.compact_min_rows = compact_min_rows
+        self.encodings_file = None
+        self._lock = threading.RLock()
+        # Autocommit mode; transactions are opened explicitly by _transaction()
+        self.conn = sqlite3.connect(self.index_file, timeout=60.0, isolation_level=None, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS members (
+                name TEXT PRIMARY KEY,
+                roll_no TEXT NOT NULL,
+                active INTEGER NOT NULL DEFAULT 1,
+                row_start INTEGER NOT NULL,
+                row_count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        with self._transaction():
+            if self.encodings_file is None:
+                self.encodings_file = self._generation_file(0)
+                self._set_meta('encodings_file', self.encodings_file)
+                self._set_meta('generation', '0')
+
+    @contextmanager
+    def _transaction(self, mode='IMMEDIATE'):
+        # IMMEDIATE takes the write lock up front; DEFERRED is a consistent read snapshot
+        with self._lock:
+            self.conn.execute(f"BEGIN {mode}")
+            try:
+                self.encodings_file = self._meta('encodings_file')
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _generation_file(self, generation):
+        return f"{self.base_path}.{generation}.f32"
+
+    def _total_rows(self):
+        if not os.path.exists(self.encodings_file):
+            return 0
+        return os.path.getsize(self.encodings_file) // ROW_BYTES
+
+    def version(self):
+        # SQLite's data_version only changes for commits made by other connections,
+        # so this connection's own writes do not count as external changes
+        with self._lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _live_rows(self):
+        return self.conn.execute("SELECT COALESCE(SUM(row_count), 0) FROM members").fetchone()[0]
+
+    def _map(self):
+        rows = self._total_rows()
+        if rows == 0:
+            return np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        return np.memmap(self.encodings_file, dtype=np.float32, mode='r', shape=(rows, ENCODING_SIZE))
+
+    def load(self):
+        # Encodings are read-only views into the mapped file, not copies. The file is
+        # mapped before the read transaction ends, so a generation switch by another
+        # process cannot delete it in between (an existing map outlives the unlink).
+        with self._transaction('DEFERRED'):
+            rows = self.conn.execute(
+                "SELECT name, roll_no, active, row_start, row_count FROM members ORDER BY row_start").fetchall()
+            gallery = self._map()
+        members = {}
+        for name, roll_no, active, row_start, row_count in rows:
+            members[name] = {
+                'roll_no': roll_no,
+                'encodings': gallery[row_start:row_start + row_count],
+                'active': bool(active)
+            }
+        logging.info(f"Mapped {len(members)} member(s) and {len(gallery)} encoding row(s) from '{self.encodings_file}'.")
+        return members
+
+    def _append(self, encodings):
+        # Only called inside a write transaction, so encodings_file is current
+        encodings = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE))
+        with open(self.encodings_file, 'ab') as f:
+            row_start = f.tell() // ROW_BYTES
+            f.write(encodings.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        return row_start, len(encodings)
+
+    def add_member(self, members, name):
+        # Rows are written before the index entry commits, so a crash can only leave dead rows
+        member = members[name]
+        with self._transaction():
+            row_start, row_count = self._append(member['encodings'])
+            self.conn.execute(
+                "INSERT OR REPLACE INTO members (name, roll_no, active, row_start, row_count) VALUES (?, ?, ?, ?, ?)",
+                (name, member['roll_no'], int(member['active']), row_start, row_count)
+            )
+
+    def add_members(self, members, names):
+        # One append and one transaction for the whole batch
+        names = list(names)
+        if not names:
+            return
+        blocks = [np.asarray(members[name]['encodings'], dtype=np.float32).reshape(-1, ENCODING_SIZE) for name in names]
+        with self._transaction():
+            row_start, _ = self._append(np.vstack(blocks))
+            rows = []
+            for name, block in zip(names, blocks):
+                member = members[name]
+                rows.append((name, member['roll_no'], int(member['active']), row_start, len(block)))
+                row_start += len(block)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO members (name, roll_no, active, row_start, row_count) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def delete_member(self, members, name):
+        with self._transaction():
+            self.conn.execute("DELETE FROM members WHERE name = ?", (name,))
+        self.maybe_compact()
+
+    def update_member(self, members, name):
+        member = members[name]
+        with self._transaction():
+            self.conn.execute("UPDATE members SET roll_no = ?, active = ? WHERE name = ?",
+                              (member['roll_no'], int(member['active']), name))
+
+    def save_all(self, members):
+        # Full rewrite, only needed for bulk replacement; normal changes use the methods above
+        with self._transaction():
+            old_file = self.encodings_file
+            generation = int(self._meta('generation') or 0) + 1
+            new_file = self._generation_file(generation)
+            rows = []
+            with open(new_file, 'wb') as f:
+                offset = 0
+                for name, member in members.items():
+                    encodings = np.ascontiguousarray(np.asarray(member['encodings'], dtype=np.float32).reshape(-1, ENCODING_SIZE))
+                    f.write(encodings.tobytes())
+                    rows.append((name, member['roll_no'], int(member['active']), offset, len(encodings)))
+                    offset += len(encodings)
+                f.flush()
+                os.fsync(f.fileno())
+            self._switch_file(new_file, generation, rows)
+        self._remove_file(old_file, new_file)
+
+    def _switch_file(self, new_file, generation, rows):
+        # Runs inside the caller's write transaction, so the index and the file it points at change together
+        self.conn.execute("DELETE FROM members")
+        self.conn.executemany(
+            "INSERT INTO members (name, roll_no, active, row_start, row_count) VALUES (?, ?, ?, ?, ?)", rows)
+        self._set_meta('encodings_file', new_file)
+        self._set_meta('generation', generation)
+        self.encodings_file = new_file
+
+    def _remove_file(self, old_file, new_file):
+        # Only after the switch has committed; maps other processes already hold stay valid
+        if old_file != new_file and os.path.exists(old_file):
+            try:
+                os.remove(old_file)
+            except OSError as e:
+                # Windows refuses to delete a file that is still mapped
+                logging.warning(f"Could not remove old encodings file '{old_file}': {e}")
+
+    def dead_rows(self):
+        with self._transaction('DEFERRED'):
+            return self._total_rows() - self._live_rows()
+
+    def maybe_compact(self):
+        with self._transaction('DEFERRED'):
+            total = self._total_rows()
+            dead = total - self._live_rows()
+        if dead >= self.compact_min_rows and dead > total * self.compact_ratio:
+            self.compact()
+
+    def compact(self):
+        # Holds the write lock throughout, so no other process can append rows the
+        # new file would miss
+        with self._transaction():
+            old_file = self.encodings_file
+            gallery = self._map()
+            generation = int(self._meta('generation') or 0) + 1
+            new_file = self._generation_file(generation)
+            rows = []
+            with open(new_file, 'wb') as f:
+                offset = 0
+                for name, roll_no, active, row_start, row_count in self.conn.execute(
+                        "SELECT name, roll_no, active, row_start, row_count FROM members ORDER BY row_start").fetchall():
+                    f.write(np.ascontiguousarray(gallery[row_start:row_start + row_count]).tobytes())
+                    rows.append((name, roll_no, active, offset, row_count))
+                    offset += row_count
+                f.flush()
+                os.fsync(f.fileno())
+            dead = len(gallery) - offset
+            del gallery
+            self._switch_file(new_file, generation, rows)
+        self._remove_file(old_file, new_file)
+        logging.info(f"Compacted member store: dropped {dead} dead encoding row(s), {offset} live row(s) remain.")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def migrate_pickle_store(data_file, base_path=None):
+    # One-shot copy of a face_data.pkl into the memory-mapped store
+    base_path = base_path or os.path.splitext(data_file)[0]
+    members = PickleMemberStore(data_file).load()
+    store = MmapMemberStore(base_path)
+    store.save_all(members)
+    store.close()
+    logging.info(f"Migrated {len(members)} member(s) from '{data_file}' to '{base_path}.sqlite'.")
+    return len(members)
+
+
+def create_member_store(storage, data_file):
+    if storage == 'pickle':
+        return PickleMemberStore(data_file)
+    if storage == 'mmap':
+        base_path = os.path.splitext(data_file)[0]
+        first_run = not os.path.exists(base_path + '.sqlite')
+        if first_run and os.path.exists(data_file):
+            migrate_pickle_store(data_file, base_path)
+        return MmapMemberStore(base_path)
+    raise ValueError(f"Unknown member storage '{storage}'. Choose from: pickle, mmap")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Member store maintenance.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = subparsers.add_parser('migrate', help="Copy a pickle store into the memory-mapped store")
+    migrate_parser.add_argument('data_file', nargs='?', default='face_data.pkl')
+    migrate_parser.add_argument('--base-path', help="Destination path without extension (default: next to the pickle)")
+    compact_parser = subparsers.add_parser('compact', help="Drop dead encoding rows from the memory-mapped store")
+    compact_parser.add_argument('base_path', nargs='?', default='face_data')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == 'migrate':
+        count = migrate_pickle_store(args.data_file, args.base_path)
+        print(f"Migrated {count} member(s).")
+    else:
+        store = MmapMemberStore(args.base_path)
+        store.compact()
+        store.close()
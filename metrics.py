@@ -0,0 +1,163 @@
+# metrics.py
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds, 0.5 ms to 10 s
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    # Cumulative bucket counts for Prometheus plus a rolling window of recent
+    # observations for percentiles. observe() is a bisect, two increments and a
+    # deque append, cheap enough for the per-frame hot path.
+
+    def __init__(self, name, description, window=1000):
+        self.name = name
+        self.description = description
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.bucket_counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.recent.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            recent = sorted(self.recent)
+            count, total = self.count, self.total
+
+        def percentile(q):
+            return 1000 * recent[min(len(recent) - 1, int(q * len(recent)))] if recent else 0.0
+        return {
+            'metric': self.name,
+            'count': count,
+            'mean_ms': 1000 * total / count if count else 0.0,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+        }
+
+    def prometheus(self):
+        with self._lock:
+            counts, count, total = list(self.bucket_counts), self.count, self.total
+        lines = [f"# HELP {self.name}_seconds {self.description}", f"# TYPE {self.name}_seconds histogram"]
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, counts):
+            cumulative += bucket_count
+            lines.append(f'{self.name}_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_seconds_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{self.name}_seconds_sum {total}")
+        lines.append(f"{self.name}_seconds_count {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def prometheus(self):
+        return [f"# HELP {self.name}_total {self.description}", f"# TYPE {self.name}_total counter",
+                f"{self.name}_total {self.value}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, description=""):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram(name, description))
+        return histogram
+
+    def counter(self, name, description=""):
+        counter = self.counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(name, Counter(name, description))
+        return counter
+
+    @contextmanager
+    def timed(self, name, description=""):
+        histogram = self.histogram(name, description)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    def _metrics(self):
+        # Copied under the lock: another thread may be registering a new metric
+        with self._lock:
+            return list(self.histograms.values()), dict(self.counters)
+
+    def snapshot(self):
+        histograms, counters = self._metrics()
+        return (
+            [histogram.snapshot() for histogram in histograms],
+            {name: counter.value for name, counter in counters.items()},
+        )
+
+    def prometheus(self):
+        histograms, counters = self._metrics()
+        lines = []
+        for metric in histograms + list(counters.values()):
+            lines.extend(metric.prometheus())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the recognizer, pipeline and app
+REGISTRY = MetricsRegistry()
+timed = REGISTRY.timed
+histogram = REGISTRY.histogram
+counter = REGISTRY.counter
+
+_server = None
+
+
+def serve_prometheus(port, host='127.0.0.1', registry=REGISTRY):
+    # Serves the registry as Prometheus text on http://host:port/metrics; idempotent per process
+    global _server
+    if _server is not None:
+        return _server
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep scrapes out of app.log
+
+    _server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+    logging.info(f"Prometheus metrics served on http://{host}:{port}/metrics")
+    return _server
@@ -0,0 +1,93 @@
+# motion_scheduler.py
+# Decides which captured frames are worth running recognition on. A static scene
+# (an empty corridor) is only re-checked every `idle_interval` seconds; motion or
+# newly appearing faces switch to processing every frame for at least `hold`
+# seconds. In every mode dispatches are spaced so recognition stays within
+# `cpu_budget` cores on average.
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import config
+import metrics
+
+MOTION_SIZE = (80, 60)  # Frames are compared as tiny grayscale thumbnails
+PIXEL_THRESHOLD = 20  # Per-pixel intensity change that counts as "changed"
+
+
+def motion_thumbnail(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.GaussianBlur(cv2.resize(gray, MOTION_SIZE, interpolation=cv2.INTER_AREA), (5, 5), 0)
+
+
+class MotionScheduler:
+    def __init__(self, motion_threshold=config.MOTION_THRESHOLD, idle_interval=config.IDLE_INTERVAL,
+                 cpu_budget=config.CPU_BUDGET, hold=2.0):
+        self.motion_threshold = motion_threshold  # Fraction of thumbnail pixels that must change
+        self.idle_interval = idle_interval
+        self.cpu_budget = cpu_budget  # Recognition seconds allowed per wall-clock second
+        self.hold = hold
+        self.reference = None  # Thumbnail of the last frame sent to recognition
+        self.active_until = 0.0
+        self.last_dispatch = 0.0
+        self.work_time = None  # Moving average of recognition time per frame
+        self.face_count = 0
+        self.mode = 'idle'
+        self.scheduled = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def motion_score(self, thumbnail):
+        if self.reference is None:
+            return 1.0
+        return float(np.count_nonzero(cv2.absdiff(thumbnail, self.reference) > PIXEL_THRESHOLD)) / thumbnail.size
+
+    def should_process(self, frame, now=None):
+        now = time.perf_counter() if now is None else now
+        thumbnail = motion_thumbnail(frame)
+        with self._lock:
+            if self.motion_score(thumbnail) >= self.motion_threshold:
+                self.active_until = now + self.hold
+            if now < self.active_until or self.face_count:
+                self.mode = 'active'
+                interval = 0.0
+            else:
+                self.mode = 'idle'
+                interval = self.idle_interval
+            if self.work_time is not None and self.cpu_budget > 0:
+                interval = max(interval, self.work_time / self.cpu_budget)
+            process = now - self.last_dispatch >= interval
+            if process:
+                self.last_dispatch = now
+                self.reference = thumbnail
+                self.scheduled += 1
+            else:
+                self.skipped += 1
+        metrics.counter('fras_frames_scheduled' if process else 'fras_frames_skipped',
+                        "Frames sent to recognition" if process else "Frames skipped by the motion scheduler").inc()
+        return process
+
+    def record_result(self, work_time, face_count, now=None):
+        # Called with each recognition result: its processing time feeds the CPU
+        # budget and newly appearing faces keep the scheduler active
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            self.work_time = work_time if self.work_time is None else 0.8 * self.work_time + 0.2 * work_time
+            if face_count > self.face_count:
+                self.active_until = now + self.hold
+            self.face_count = face_count
+
+    def skip_rate(self):
+        with self._lock:
+            total = self.scheduled + self.skipped
+            return self.skipped / total if total else 0.0
+
+    def reset(self):
+        with self._lock:
+            self.reference = None
+            self.active_until = self.last_dispatch = 0.0
+            self.work_time = None
+            self.face_count = self.scheduled = self.skipped = 0
+            self.mode = 'idle'
@@ -0,0 +1,83 @@
+# recognition_cache.py
+# Short-lived cache of recent encodings -> match results. Someone standing in
+# front of a camera produces near-identical encodings frame after frame; a probe
+# within `radius` of a cached encoding reuses that encoding's result instead of
+# searching the whole gallery. Capacity is fixed (least recently used entries are
+# replaced) and entries expire after `ttl` seconds.
+#
+# By the triangle inequality every gallery distance seen from a probe within
+# `radius` of a cached encoding differs from the cached one by at most `radius`.
+# A result is therefore only cached when no such probe could get a different
+# answer: unknowns whose closest distance exceeds tolerance + radius, and matches
+# within tolerance - radius whose runner-up member is more than 2 * radius
+# farther away, so no other member can overtake them.
+import threading
+import time
+
+import numpy as np
+
+import config
+import metrics
+
+ENCODING_SIZE = 128
+
+
+class RecognitionCache:
+    def __init__(self, max_entries=config.RECOGNITION_CACHE_SIZE, ttl=config.RECOGNITION_CACHE_TTL,
+                 radius=config.RECOGNITION_CACHE_RADIUS):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.radius = radius
+        self.encodings = np.zeros((self.max_entries, ENCODING_SIZE), dtype=np.float32)
+        self.results = [None] * self.max_entries  # (name or None, distance, tolerance)
+        self.expires_at = np.zeros(self.max_entries)  # 0 marks an empty slot
+        self.last_used = np.zeros(self.max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, encoding, tolerance, now=None):
+        # Returns the cached (name or None, distance) for a nearby encoding, or None on a miss
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            live = np.flatnonzero(self.expires_at > now)
+            if len(live):
+                distances = np.linalg.norm(self.encodings[live] - np.asarray(encoding, dtype=np.float32), axis=1)
+                nearest = int(np.argmin(distances))
+                slot = live[nearest]
+                if distances[nearest] <= self.radius and self.results[slot][2] == tolerance:
+                    self.last_used[slot] = now
+                    self.hits += 1
+                    metrics.counter('fras_recognition_cache_hits', "Matches answered by the recognition cache").inc()
+                    return self.results[slot][:2]
+            self.misses += 1
+        metrics.counter('fras_recognition_cache_misses', "Matches that searched the gallery").inc()
+        return None
+
+    def insert(self, encoding, name, distance, runner_up, tolerance, now=None):
+        # name, distance and runner_up come from a matcher search with runner_up=True
+        if distance - self.radius > tolerance:
+            name = None  # Unknown for every nearby probe, whoever is closest
+        elif distance + self.radius > tolerance:
+            return  # A nearby probe could fall on the other side of the tolerance
+        elif runner_up - distance <= 2 * self.radius:
+            return  # A nearby probe could be closer to the runner-up member
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = np.flatnonzero(self.expires_at <= now)
+            slot = expired[0] if len(expired) else int(np.argmin(self.last_used))
+            self.encodings[slot] = encoding
+            self.results[slot] = (name, distance, tolerance)
+            self.expires_at[slot] = now + self.ttl
+            self.last_used[slot] = now
+
+    def clear(self):
+        # Called whenever the roster changes, since any cached result may now be wrong
+        with self._lock:
+            self.expires_at[:] = 0
+            self.results = [None] * self.max_entries
+
+    def hit_rate(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return self.hits / total if total else 0.0
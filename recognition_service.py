@@ -0,0 +1,455 @@
+# recognition_service.py
+# Long-running recognition service for several cameras. One process owns the
+# gallery and the attendance store (so attendance dedup is shared by every
+# camera); each camera runs in its own worker process and hands frames over
+# through shared memory. Clients such as the Streamlit app fetch results and
+# annotated frames over a local multiprocessing connection.
+#
+#   python recognition_service.py --camera 0 --camera rtsp://10.0.0.5/stream \
+#       --camera fake:recordings/room_101 --address 127.0.0.1:6010
+#
+# A camera source prefixed with "fake:" is served by FakeCamera from a directory
+# of images or a video file, which is how the service is exercised without hardware.
+import argparse
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import AuthenticationError, resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+
+import cv2
+import numpy as np
+
+import config
+import metrics
+from motion_scheduler import MotionScheduler
+from video_pipeline import draw_faces
+
+FRAME_SHAPE = (480, 640, 3)
+SLOTS_PER_CAMERA = 3
+
+
+def parse_address(address):
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+def require_authkey(authkey):
+    if not authkey:
+        raise ValueError("Set FRAS_SERVICE_AUTHKEY to a shared secret to run or connect to the recognition service.")
+    return authkey
+
+
+def open_camera(source):
+    if isinstance(source, str) and source.startswith('fake:'):
+        from fake_camera import FakeCamera
+        return FakeCamera(source[len('fake:'):], fps=15)
+    capture = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    capture.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_SHAPE[1])
+    capture.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_SHAPE[0])
+    return capture
+
+
+def attach_shared_memory(name):
+    # Only the service owns (and unlinks) the buffer; an attaching process must not
+    # register it with the resource tracker or it gets reported as leaked on exit
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def camera_worker(camera_id, source, shm_name, frame_queue, free_slots, stop_event):
+    # Runs in its own process: reads frames into free shared-memory slots and
+    # announces them to the service. When every slot is still in use the frame
+    # is dropped, so the service only ever sees recent frames.
+    shm = attach_shared_memory(shm_name)
+    slots = np.ndarray((SLOTS_PER_CAMERA,) + FRAME_SHAPE, dtype=np.uint8, buffer=shm.buf)
+    capture = open_camera(source)
+    sequence = 0
+    try:
+        if not capture.isOpened():
+            logging.error(f"Camera {camera_id}: cannot open source {source}")
+            return
+        while not stop_event.is_set():
+            ret, frame = capture.read()
+            if not ret:
+                logging.error(f"Camera {camera_id}: failed to capture frame")
+                break
+            try:
+                slot = free_slots.get_nowait()
+            except queue.Empty:
+                continue
+            if frame.shape != FRAME_SHAPE:
+                frame = cv2.resize(frame, (FRAME_SHAPE[1], FRAME_SHAPE[0]))
+            slots[slot] = frame
+            sequence += 1
+            frame_queue.put((camera_id, slot, sequence, time.time()))
+    finally:
+        capture.release()
+        del slots
+        shm.close()
+
+
+class CameraChannel:
+    def __init__(self, ctx, camera_id, source, frame_queue, stop_event):
+        self.camera_id = camera_id
+        self.source = source
+        size = SLOTS_PER_CAMERA * int(np.prod(FRAME_SHAPE))
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.slots = np.ndarray((SLOTS_PER_CAMERA,) + FRAME_SHAPE, dtype=np.uint8, buffer=self.shm.buf)
+        self.free_slots = ctx.Queue()
+        for slot in range(SLOTS_PER_CAMERA):
+            self.free_slots.put(slot)
+        self.process = ctx.Process(
+            target=camera_worker,
+            args=(camera_id, source, self.shm.name, frame_queue, self.free_slots, stop_event),
+            name=f"camera-{camera_id}",
+            daemon=True,
+        )
+        self.busy = False
+        self.scheduler = MotionScheduler() if config.ADAPTIVE_SCHEDULING else None
+        self.latest = {'sequence': 0, 'timestamp': None, 'faces': [], 'frame': None}
+
+    def close(self):
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        del self.slots
+        self.shm.close()
+        self.shm.unlink()
+
+
+class RecognitionService:
+    def __init__(self, sources, recognizer, workers=config.PIPELINE_WORKERS, address=('127.0.0.1', 6010),
+                 authkey=config.SERVICE_AUTHKEY):
+        self.authkey = require_authkey(authkey)
+        self.ctx = mp.get_context('spawn')
+        self.recognizer = recognizer
+        self.frame_queue = self.ctx.Queue()
+        self.stop_event = self.ctx.Event()
+        self.cameras = {
+            camera_id: CameraChannel(self.ctx, camera_id, source, self.frame_queue, self.stop_event)
+            for camera_id, source in enumerate(sources)
+        }
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='service-recognition')
+        self.address = address
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        self._running = True
+        for camera in self.cameras.values():
+            camera.process.start()
+        threading.Thread(target=self._serve_clients, name='service-listener', daemon=True).start()
+        logging.info(f"Recognition service started with {len(self.cameras)} camera(s) on {self.address}.")
+        return self
+
+    def run_forever(self):
+        try:
+            while self._running:
+                self._dispatch_once(timeout=0.5)
+        finally:
+            self.stop()
+
+    def _dispatch_once(self, timeout):
+        # Drain announced frames, keep the newest per idle camera and release the rest
+        try:
+            announcements = [self.frame_queue.get(timeout=timeout)]
+        except queue.Empty:
+            return
+        while True:
+            try:
+                announcements.append(self.frame_queue.get_nowait())
+            except queue.Empty:
+                break
+        newest = {}
+        for camera_id, slot, sequence, timestamp in announcements:
+            previous = newest.get(camera_id)
+            if previous is not None:
+                self.cameras[camera_id].free_slots.put(previous[0])
+            newest[camera_id] = (slot, sequence, timestamp)
+        for camera_id, (slot, sequence, timestamp) in newest.items():
+            camera = self.cameras[camera_id]
+            with self._lock:
+                if camera.busy or (camera.scheduler is not None
+                                   and not camera.scheduler.should_process(camera.slots[slot])):
+                    camera.free_slots.put(slot)
+                    continue
+                camera.busy = True
+            self.executor.submit(self._process, camera, slot, sequence, timestamp)
+
+    def _process(self, camera, slot, sequence, timestamp):
+        try:
+            frame = camera.slots[slot].copy()
+            camera.free_slots.put(slot)
+            start = time.perf_counter()
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # Frames from different cameras are detected concurrently on the pool; every
+            # detector backend keeps one underlying detector per thread for this
+            # (benchmarks/stress_service_cameras.py checks the results)
+            face_locations = self.recognizer.detect_faces(rgb_frame)
+            face_encodings = self.recognizer.encode_faces(rgb_frame, face_locations)
+            # identify_faces marks attendance under the recognizer lock, so a member
+            # seen by two cameras at once is still only marked once
+            faces = self.recognizer.identify_faces(face_locations, face_encodings)
+            metrics.histogram('fras_service_latency', "Camera capture to result latency").observe(time.time() - timestamp)
+            if camera.scheduler is not None:
+                camera.scheduler.record_result(time.perf_counter() - start, len(faces))
+            with self._lock:
+                camera.latest = {'sequence': sequence, 'timestamp': timestamp, 'faces': faces, 'frame': frame}
+        except Exception as e:
+            logging.error(f"Camera {camera.camera_id}: face recognition error: {e}")
+        finally:
+            with self._lock:
+                camera.busy = False
+
+    def handle_request(self, request):
+        command = request[0]
+        if command == 'cameras':
+            return {camera_id: str(camera.source) for camera_id, camera in self.cameras.items()}
+        if command == 'latest':
+            camera_id, with_frame = request[1], request[2]
+            with self._lock:
+                latest = dict(self.cameras[camera_id].latest)
+            frame = latest.pop('frame')
+            if with_frame and frame is not None:
+                ok, jpeg = cv2.imencode('.jpg', draw_faces(frame.copy(), latest['faces']))
+                latest['jpeg'] = jpeg.tobytes() if ok else None
+            return latest
+        if command == 'reload_members':
+            self.recognizer.reload_members()
+            return True
+        if command == 'stats':
+            return metrics.REGISTRY.snapshot()
+        return self._handle_admin(command, request[1:])
+
+    def _handle_admin(self, command, args):
+        # Member and attendance operations for thin clients (RemoteRecognizer); the
+        # service owns the gallery and the attendance writer, so changes made here are
+        # live for every camera at once
+        recognizer = self.recognizer
+        if command == 'reload_if_changed':
+            return recognizer.reload_if_changed()
+        if command == 'authenticate':
+            return recognizer.authenticate_admin(args[0])
+        if command == 'members':
+            with recognizer.lock:
+                return {name: {'roll_no': member['roll_no'], 'active': member['active']}
+                        for name, member in recognizer.get_data().items()}
+        if command in ('add_member', 'delete_member'):
+            # Checked here rather than trusted from the app: any client with the authkey
+            # can send these
+            admin_password, *args = args
+            if not recognizer.authenticate_admin(admin_password):
+                raise PermissionError("Incorrect admin password.")
+            if command == 'add_member':
+                return recognizer.add_new_member(*args)
+            return recognizer.delete_member(args[0])
+        if command == 'count_records':
+            return recognizer.count_attendance_records(*args)
+        if command == 'records':
+            start_date, end_date, roll_no, limit, offset = args
+            return recognizer.get_attendance_records(start_date, end_date, roll_no, limit=limit, offset=offset)
+        if command == 'export_records':
+            return recognizer.export_attendance_csv(*args)  # Streamed to the client chunk by chunk
+        if command == 'report':
+            return recognizer.get_attendance_report().cursor
+        if command == 'report_daily':
+            return recognizer.attendance_report.daily(*args)
+        if command == 'report_members':
+            return recognizer.attendance_report.members(*args)
+        raise ValueError(f"Unknown command: {command}")
+
+    def _serve_clients(self):
+        with Listener(self.address, authkey=self.authkey) as listener:
+            while self._running:
+                try:
+                    connection = listener.accept()
+                except AuthenticationError:
+                    logging.warning("Rejected a service connection with the wrong authkey.")
+                    continue
+                except OSError:
+                    break
+                threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+
+    def _serve_connection(self, connection):
+        with connection:
+            while self._running:
+                try:
+                    request = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    result = self.handle_request(request)
+                    if isinstance(result, types.GeneratorType):
+                        for chunk in result:
+                            connection.send(('more', chunk))
+                        result = None
+                    connection.send(('ok', result))
+                except Exception as e:
+                    connection.send(('error', str(e)))
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self.stop_event.set()
+        self.executor.shutdown(wait=True)
+        for camera in self.cameras.values():
+            camera.close()
+        logging.info("Recognition service stopped.")
+
+
+class RecognitionServiceClient:
+    # Thin client used by the Streamlit app; one connection, safe to share between threads
+
+    def __init__(self, address, authkey=config.SERVICE_AUTHKEY):
+        self.connection = Client(parse_address(address) if isinstance(address, str) else address,
+                                 authkey=require_authkey(authkey))
+        self._lock = threading.Lock()
+
+    def _call(self, *request):
+        with self._lock:
+            self.connection.send(request)
+            status, result = self.connection.recv()
+        if status != 'ok':
+            raise RuntimeError(result)
+        return result
+
+    def cameras(self):
+        return self._call('cameras')
+
+    def latest(self, camera_id, with_frame=True):
+        return self._call('latest', camera_id, with_frame)
+
+    def reload_members(self):
+        return self._call('reload_members')
+
+    def _stream(self, *request):
+        # For commands whose result arrives as a series of chunks
+        with self._lock:
+            self.connection.send(request)
+            status = 'more'
+            try:
+                while True:
+                    status, result = self.connection.recv()
+                    if status != 'more':
+                        break
+                    yield result
+            finally:
+                while status == 'more':  # Abandoned part-way; drain so the connection stays usable
+                    status, result = self.connection.recv()
+        if status != 'ok':
+            raise RuntimeError(result)
+
+    def stats(self):
+        return self._call('stats')
+
+    def close(self):
+        self.connection.close()
+
+
+class RemoteReport:
+    # The parts of AttendanceReport the app uses, answered by the service's warm report
+
+    def __init__(self, client, cursor):
+        self.client = client
+        self.cursor = cursor
+
+    def daily(self, start_date=None, end_date=None):
+        return self.client._call('report_daily', start_date, end_date)
+
+    def members(self, start_date=None, end_date=None, roster=None):
+        return self.client._call('report_members', start_date, end_date, roster)
+
+
+class RemoteRecognizer:
+    # Stands in for LiveFaceRecognizer in the app when a recognition service is
+    # configured: member administration and attendance queries go to the service,
+    # so the app loads no gallery, matcher or detector of its own
+
+    def __init__(self, address, authkey=config.SERVICE_AUTHKEY):
+        self.client = RecognitionServiceClient(address, authkey)
+        self.report_warm = threading.Event()
+        self.report_warm.set()  # The service builds its report at startup
+
+    def reload_if_changed(self):
+        return self.client._call('reload_if_changed')
+
+    def reload_members(self):
+        return self.client.reload_members()
+
+    def authenticate_admin(self, password):
+        return self.client._call('authenticate', password)
+
+    def get_data(self):
+        return self.client._call('members')
+
+    def get_all_members(self):
+        return {name: member['active'] for name, member in self.get_data().items()}
+
+    # Member changes carry the admin password, which the service checks itself
+    def add_new_member(self, name, roll_no, face_encodings, admin_password=None):
+        return self.client._call('add_member', admin_password, name, roll_no,
+                                 [np.asarray(encoding) for encoding in face_encodings])
+
+    def delete_member(self, name, admin_password=None):
+        return self.client._call('delete_member', admin_password, name)
+
+    def count_attendance_records(self, start_date=None, end_date=None, roll_no=None):
+        return self.client._call('count_records', start_date, end_date, roll_no)
+
+    def get_attendance_records(self, start_date=None, end_date=None, roll_no=None, limit=None, offset=0):
+        return self.client._call('records', start_date, end_date, roll_no, limit, offset)
+
+    def export_attendance_csv(self, start_date=None, end_date=None, roll_no=None):
+        return self.client._stream('export_records', start_date, end_date, roll_no)
+
+    def get_attendance_report(self):
+        return RemoteReport(self.client, self.client._call('report'))
+
+    def close(self):
+        self.client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-camera face recognition service.")
+    parser.add_argument('--camera', action='append', required=True,
+                        help="Camera index, video URL, or fake:<dir or video file>; repeat for each camera")
+    parser.add_argument('--address', default=config.SERVICE_ADDRESS or '127.0.0.1:6010')
+    parser.add_argument('--workers', type=int, default=config.PIPELINE_WORKERS)
+    parser.add_argument('--metrics-port', type=int, default=config.METRICS_PORT,
+                        help="Serve Prometheus metrics on this local port (0 disables)")
+    args = parser.parse_args()
+    if not config.SERVICE_AUTHKEY:
+        parser.error("FRAS_SERVICE_AUTHKEY must be set to a shared secret; clients connect with the same value")
+
+    from live_face_recognizer import LiveFaceRecognizer
+    recognizer = LiveFaceRecognizer(matcher=config.MATCHER, detection_scale=config.DETECTION_SCALE,
+                                    storage=config.MEMBER_STORAGE,
+                                    attendance_backend=config.ATTENDANCE_BACKEND, detector=config.DETECTOR,
+                                    cache_size=config.RECOGNITION_CACHE_SIZE, warm_report=True)
+    service = RecognitionService(args.camera, recognizer, workers=args.workers,
+                                 address=parse_address(args.address)).start()
+    if args.metrics_port:
+        try:
+            metrics.serve_prometheus(args.metrics_port)
+        except OSError as e:
+            logging.error(f"Failed to start metrics endpoint on port {args.metrics_port}: {e}")
+    try:
+        service.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recognizer.close()
+
+
+if __name__ == '__main__':
+    main()
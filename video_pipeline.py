@@ -0,0 +1,203 @@
+# video_pipeline.py
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+import metrics
+
+
+class StageStats:
+    # Rolling throughput and latency for one pipeline stage over the last `window` events
+
+    def __init__(self, name, window=120):
+        self.name = name
+        self._events = deque(maxlen=window)  # (finished_at, duration)
+        self._lock = threading.Lock()
+
+    def record(self, duration, finished_at=None):
+        with self._lock:
+            self._events.append((finished_at or time.perf_counter(), duration))
+
+    def snapshot(self):
+        with self._lock:
+            events = list(self._events)
+        if not events:
+            return {'stage': self.name, 'fps': 0.0, 'latency_ms': 0.0, 'max_latency_ms': 0.0}
+        span = events[-1][0] - events[0][0]
+        durations = [duration for _, duration in events]
+        return {
+            'stage': self.name,
+            'fps': (len(events) - 1) / span if span > 0 else 0.0,
+            'latency_ms': 1000 * sum(durations) / len(durations),
+            'max_latency_ms': 1000 * max(durations),
+        }
+
+
+class FrameGrabber:
+    # Reads the camera on its own thread and keeps only the newest frame, so slow
+    # consumers always see a current frame instead of a backlog of stale ones.
+
+    def __init__(self, capture):
+        self.capture = capture
+        self.stats = StageStats('capture')
+        self.frame_id = 0
+        self.frame = None
+        self.captured_at = None
+        self.error = None
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = threading.Thread(target=self._run, name='frame-grabber', daemon=True)
+
+    def start(self):
+        self._running = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._thread.join(timeout=1.0)
+        with self._condition:
+            self._condition.notify_all()
+
+    def is_running(self):
+        return self._running and self._thread.is_alive()
+
+    def _run(self):
+        while self._running and self.capture.isOpened():
+            start = time.perf_counter()
+            ret, frame = self.capture.read()
+            if not ret:
+                self.error = "Failed to capture frame."
+                logging.error("Frame grabber failed to capture frame.")
+                break
+            now = time.perf_counter()
+            self.stats.record(now - start, now)
+            metrics.histogram('fras_capture', "Camera read time per frame").observe(now - start)
+            with self._condition:
+                self.frame_id += 1
+                self.frame = frame
+                self.captured_at = now
+                self._condition.notify_all()
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+
+    def latest(self):
+        with self._condition:
+            return self.frame_id, self.frame, self.captured_at
+
+    def wait_for_frame(self, after_id, timeout=1.0):
+        # Blocks until a frame newer than after_id exists; returns (frame_id, frame, captured_at)
+        with self._condition:
+            self._condition.wait_for(lambda: self.frame_id > after_id or not self._running, timeout)
+            return self.frame_id, self.frame, self.captured_at
+
+
+class RecognitionPipeline:
+    # Runs detection + encoding for the newest captured frame on a pool of worker
+    # threads (dlib releases the GIL) and publishes the most recent results.
+    # A new frame is only dispatched when a worker is free, so frames that
+    # arrive while every worker is busy are dropped rather than queued.
+
+    def __init__(self, recognizer, grabber, workers=2, tracker=None, scheduler=None):
+        self.recognizer = recognizer
+        # Optional FaceTracker; when set only new or stale tracks are re-encoded
+        self.tracker = tracker
+        # Optional MotionScheduler; when set frames of a static scene are not dispatched
+        self.scheduler = scheduler
+        self.grabber = grabber
+        self.workers = max(1, workers)
+        self.stats = {
+            'detect': StageStats('detect'),
+            'encode': StageStats('encode'),
+            'match': StageStats('match'),
+            'end_to_end': StageStats('end_to_end'),
+        }
+        self.results = []
+        self.results_frame_id = 0
+        self._results_lock = threading.Lock()
+        self._slots = threading.Semaphore(self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='recognition')
+        self._running = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name='recognition-dispatcher', daemon=True)
+
+    def start(self):
+        self._running = True
+        self._dispatcher.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._dispatcher.join(timeout=1.0)
+        self._executor.shutdown(wait=True)
+
+    def _dispatch(self):
+        last_id = 0
+        while self._running:
+            if not self._slots.acquire(timeout=0.1):
+                continue
+            frame_id, frame, captured_at = self.grabber.wait_for_frame(last_id, timeout=0.5)
+            if frame is None or frame_id <= last_id:
+                self._slots.release()
+                if not self.grabber.is_running():
+                    break
+                continue
+            last_id = frame_id
+            if self.scheduler is not None and not self.scheduler.should_process(frame):
+                self._slots.release()
+                continue
+            future = self._executor.submit(self._process, frame_id, frame, captured_at)
+            future.add_done_callback(lambda _: self._slots.release())
+
+    def _process(self, frame_id, frame, captured_at):
+        try:
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            start = time.perf_counter()
+            face_locations = self.recognizer.detect_faces(rgb_frame)
+            detected = time.perf_counter()
+            if self.tracker is not None:
+                plan = self.tracker.associate(face_locations, frame_id)
+                face_encodings = self.recognizer.encode_faces(rgb_frame, plan.locations_to_encode())
+                encoded = time.perf_counter()
+                recognized_faces = self.tracker.resolve(plan, face_encodings)
+            else:
+                face_encodings = self.recognizer.encode_faces(rgb_frame, face_locations)
+                encoded = time.perf_counter()
+                recognized_faces = self.recognizer.identify_faces(face_locations, face_encodings)
+            matched = time.perf_counter()
+        except Exception as e:
+            logging.error(f"Face recognition error: {e}")
+            return
+
+        self.stats['detect'].record(detected - start, detected)
+        self.stats['encode'].record(encoded - detected, encoded)
+        self.stats['match'].record(matched - encoded, matched)
+        self.stats['end_to_end'].record(matched - captured_at, matched)
+        metrics.histogram('fras_end_to_end', "Capture to recognition result latency").observe(matched - captured_at)
+        if self.scheduler is not None:
+            self.scheduler.record_result(matched - start, len(recognized_faces))
+        with self._results_lock:
+            # Workers can finish out of order; never replace newer results with older ones
+            if frame_id > self.results_frame_id:
+                self.results_frame_id = frame_id
+                self.results = recognized_faces
+
+    def latest_results(self):
+        with self._results_lock:
+            return self.results_frame_id, self.results
+
+    def snapshot(self):
+        return [self.grabber.stats.snapshot()] + [stats.snapshot() for stats in self.stats.values()]
+
+
+def draw_faces(frame, recognized_faces):
+    for face in recognized_faces:
+        (top, right, bottom, left) = face['location']
+        name = face['name']
+        cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+        cv2.putText(frame, name, (left, bottom + 10), cv2.FONT_HERSHEY_SIMPLEX, 0.60, (255, 0, 0,), 1)
+    return frame